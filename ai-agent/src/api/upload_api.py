@@ -6,15 +6,26 @@ It handles document uploads, processing, and indexing into the RAG system.
 """
 
 from flask import Flask, request, jsonify
+from waitress import serve
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget, ValueTarget
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
+import hashlib
 import logging
-import json
-import uuid
-from datetime import datetime
+import queue
+import orjson
+import secrets
+import sqlite3
+import threading
+import time
 
 # Import our components
 from src.preprocessing.processor import DocumentProcessor
 from src.indexing.indexer import DocumentIndexer
+from src.config import DB_PATH, MAX_RETRIES, BATCH_SIZE
+from src.utils.timestamps import now_iso
 
 app = Flask(__name__)
 
@@ -30,33 +41,313 @@ logger.setLevel(logging.INFO)
 processor = DocumentProcessor()
 indexer = DocumentIndexer()
 
+# Read size for streaming multipart uploads to disk
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Background workers for processing uploads, so the HTTP request returns as
+# soon as the file is on disk
+PROCESSING_WORKERS = 4
+executor = ThreadPoolExecutor(max_workers=PROCESSING_WORKERS, thread_name_prefix='upload_worker')
+
+# Indexing calls out to the RAG service, so a failed attempt is retried with
+# exponential backoff (1s, 2s, 4s, ...) before the job is marked failed
+INDEX_RETRY_BASE_DELAY = 1
+
+# Processed uploads waiting to be indexed. A single consumer drains up to
+# BATCH_SIZE of them at a time, waiting at most INDEX_MAX_LINGER seconds for
+# a batch to fill, so uploads arriving together are indexed together.
+INDEX_QUEUE_SIZE = 1000
+INDEX_MAX_LINGER = 0.5
+index_queue = queue.Queue(maxsize=INDEX_QUEUE_SIZE)
+
+# Parsed sidecar metadata by path, as (mtime_ns, metadata)
+metadata_cache = {}
+metadata_cache_lock = threading.Lock()
+
+# Clients may reuse an unchanged /documents listing for this many seconds
+DOCUMENTS_MAX_AGE = 2
+
+# Job status by job id
+jobs = {}
+jobs_lock = threading.Lock()
+
+# Finished (completed or failed) job ids in the order they finished, with the
+# time.monotonic() they finished at. Finished jobs stay queryable for
+# FINISHED_JOB_TTL seconds, and at most MAX_FINISHED_JOBS are kept.
+FINISHED_JOB_STATUSES = ('completed', 'failed')
+FINISHED_JOB_TTL = 3600
+MAX_FINISHED_JOBS = 1000
+finished_jobs = OrderedDict()
+
+# Upload records, so listing uploads is one query instead of a sidecar read
+# per file. Sidecars are still written because the processor reads them.
+UPLOAD_DIR = 'data/uploads'
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+db_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+db_lock = threading.Lock()
+
+class HashingFileTarget(FileTarget):
+    """FileTarget that hashes the file part as it is streamed to disk"""
+    
+    def __init__(self, filename):
+        """Initialize with the path to stream the file part to"""
+        super().__init__(filename)
+        self.hasher = hashlib.blake2b(digest_size=32)
+    
+    def on_data_received(self, chunk):
+        """Hash and write a chunk of the file part"""
+        self.hasher.update(chunk)
+        super().on_data_received(chunk)
+
+def _init_db():
+    """Create the uploads table and backfill it from existing sidecar files"""
+    with db_lock:
+        db_conn.execute('PRAGMA journal_mode=WAL')
+        db_conn.execute('PRAGMA synchronous=NORMAL')
+        db_conn.execute('''
+            CREATE TABLE IF NOT EXISTS uploads (
+                filename TEXT PRIMARY KEY,
+                original_filename TEXT,
+                upload_time TEXT,
+                source TEXT,
+                uploaded_by TEXT,
+                indexed_at TEXT,
+                processed_path TEXT,
+                metadata_json TEXT,
+                content_hash TEXT
+            )
+        ''')
+        
+        # Tables created before content hashing was added lack the column
+        columns = [row[1] for row in db_conn.execute('PRAGMA table_info(uploads)')]
+        if 'content_hash' not in columns:
+            db_conn.execute('ALTER TABLE uploads ADD COLUMN content_hash TEXT')
+        db_conn.execute('CREATE INDEX IF NOT EXISTS idx_uploads_content_hash ON uploads(content_hash)')
+        
+        # Uploads made before the table existed only have sidecar files
+        try:
+            upload_entries, upload_meta = _scan_directory(UPLOAD_DIR)
+        except FileNotFoundError:
+            upload_entries, upload_meta = [], {}
+        
+        for entry in upload_entries:
+            meta_entry = upload_meta.get(entry.name + ".meta.json")
+            if meta_entry is None:
+                continue
+            try:
+                with open(meta_entry.path, 'rb') as f:
+                    metadata_json = f.read()
+                metadata = orjson.loads(metadata_json)
+            except (OSError, orjson.JSONDecodeError) as e:
+                logger.warning(f"Skipping unreadable metadata {meta_entry.path}: {str(e)}")
+                continue
+            db_conn.execute(
+                'INSERT OR IGNORE INTO uploads (filename, original_filename, upload_time, source, uploaded_by, metadata_json) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    entry.name,
+                    metadata.get('original_filename', entry.name),
+                    metadata.get('upload_time', ''),
+                    metadata.get('source', 'unknown'),
+                    metadata.get('uploaded_by', 'unknown'),
+                    metadata_json.decode('utf-8')
+                )
+            )
+        db_conn.commit()
+
+def _update_upload_record(filename, **fields):
+    """Update columns of an upload record"""
+    columns = ', '.join(f"{column} = ?" for column in fields)
+    with db_lock:
+        db_conn.execute(f"UPDATE uploads SET {columns} WHERE filename = ?", (*fields.values(), filename))
+        db_conn.commit()
+
+def _find_indexed_duplicate(content_hash):
+    """Find an already indexed upload with the same content, as (filename, processed_path)"""
+    with db_lock:
+        row = db_conn.execute(
+            'SELECT filename, processed_path FROM uploads '
+            'WHERE content_hash = ? AND indexed_at IS NOT NULL LIMIT 1',
+            (content_hash,)
+        ).fetchone()
+    
+    # The processed artifact may have been cleaned up since
+    if row and row[1] and os.path.exists(row[1]):
+        return row
+    return None
+
+def _set_job_status(job_id, **fields):
+    """Update the status record of a background job, evicting expired finished jobs"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        job['updated_at'] = now_iso()
+        
+        now = time.monotonic()
+        if job['status'] in FINISHED_JOB_STATUSES:
+            finished_jobs[job_id] = now
+            finished_jobs.move_to_end(job_id)
+        
+        # Oldest finished jobs come first, so trimming stops at the first one kept
+        while finished_jobs:
+            oldest_id, finished_at = next(iter(finished_jobs.items()))
+            if len(finished_jobs) <= MAX_FINISHED_JOBS and now - finished_at < FINISHED_JOB_TTL:
+                break
+            del finished_jobs[oldest_id]
+            jobs.pop(oldest_id, None)
+
+def _index_batch(batch):
+    """Index a batch of processed uploads, retrying failures with exponential backoff"""
+    pending = batch
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            delay = INDEX_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            logger.warning(f"Indexing failed for {len(pending)} uploads, retrying in {delay}s "
+                           f"(attempt {attempt + 1} of {MAX_RETRIES + 1})")
+            for job_id, _, _, _ in pending:
+                _set_job_status(job_id, attempts=attempt + 1)
+            time.sleep(delay)
+        
+        try:
+            indexed = set(indexer.index_documents([processed_path for _, _, processed_path, _ in pending]))
+        except Exception as e:
+            logger.error(f"Error indexing batch of {len(pending)} uploads: {str(e)}")
+            indexed = set()
+        
+        failed = []
+        for job_id, file_path, processed_path, original_filename in pending:
+            if processed_path in indexed:
+                logger.info(f"Successfully processed and indexed: {original_filename}")
+                _update_upload_record(os.path.basename(file_path), indexed_at=now_iso())
+                _set_job_status(job_id, status='completed')
+            else:
+                failed.append((job_id, file_path, processed_path, original_filename))
+        
+        pending = failed
+        if not pending:
+            return
+    
+    for job_id, _, _, original_filename in pending:
+        logger.error(f"Failed to index: {original_filename}")
+        _set_job_status(job_id, status='failed', error='Document was processed but indexing failed')
+
+def _index_consumer():
+    """Drain the index queue forever, indexing processed uploads in batches"""
+    while True:
+        batch = [index_queue.get()]
+        deadline = time.monotonic() + INDEX_MAX_LINGER
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(index_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        _index_batch(batch)
+
+def _process_upload(job_id, file_path, original_filename):
+    """Process an uploaded file and queue it for indexing (runs on a background worker)"""
+    _set_job_status(job_id, status='processing')
+    
+    try:
+        logger.info(f"Processing file: {original_filename}")
+        processed_path = processor.process_file(file_path)
+        
+        if not processed_path:
+            logger.error(f"Failed to process: {original_filename}")
+            _set_job_status(job_id, status='failed', error='Failed to process document')
+            return
+        
+        # Hand the processed file to the batching index consumer
+        _set_job_status(job_id, status='indexing', processed_path=processed_path)
+        _update_upload_record(os.path.basename(file_path), processed_path=processed_path)
+        logger.info(f"Queued for indexing: {original_filename}")
+        index_queue.put((job_id, file_path, processed_path, original_filename))
+    
+    except Exception as e:
+        logger.error(f"Error processing document {original_filename}: {str(e)}")
+        _set_job_status(job_id, status='failed', error=f'Error processing document: {str(e)}')
+
+def _discard_partial_upload(path):
+    """Remove a partially streamed upload, if it was created"""
+    if os.path.exists(path):
+        os.remove(path)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         "status": "online",
         "service": "Document Upload API",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     }), 200
 
 @app.route('/upload', methods=['POST'])
 def upload_document():
     """API endpoint for uploading firm-specific documents"""
-    if 'file' not in request.files:
+    # Parse the multipart body straight from the request stream so the file
+    # is written to disk as it arrives instead of being buffered by werkzeug
+    try:
+        parser = StreamingFormDataParser(headers=request.headers)
+    except Exception:
         logger.error("No file part in the request")
         return jsonify({'error': 'No file part'}), 400
     
-    file = request.files['file']
+    # Stream into a temporary name; the final name needs the original extension
+    temp_path = os.path.join(UPLOAD_DIR, secrets.token_hex(16) + ".part")
+    file_target = HashingFileTarget(temp_path)
+    metadata_target = ValueTarget()
+    user_target = ValueTarget()
+    parser.register('file', file_target)
+    parser.register('metadata', metadata_target)
+    parser.register('user', user_target)
+    
+    try:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+    except Exception as e:
+        logger.error(f"Error reading upload stream: {str(e)}")
+        _discard_partial_upload(temp_path)
+        return jsonify({'error': 'Malformed upload'}), 400
     
-    if file.filename == '':
+    if file_target.multipart_filename is None:
+        logger.error("No file part in the request")
+        _discard_partial_upload(temp_path)
+        return jsonify({'error': 'No file part'}), 400
+    
+    if file_target.multipart_filename == '':
         logger.error("No selected file")
+        _discard_partial_upload(temp_path)
         return jsonify({'error': 'No selected file'}), 400
     
+    # Identical content that was already indexed needs no reprocessing
+    original_filename = file_target.multipart_filename
+    content_hash = file_target.hasher.hexdigest()
+    duplicate = _find_indexed_duplicate(content_hash)
+    if duplicate is not None:
+        existing_filename, processed_path = duplicate
+        _discard_partial_upload(temp_path)
+        logger.info(f"Duplicate upload of {existing_filename}, skipping processing: {original_filename}")
+        return jsonify({
+            'success': True,
+            'message': 'Document already uploaded and indexed',
+            'duplicate': True,
+            'filename': existing_filename,
+            'processed_path': processed_path,
+            'original_filename': original_filename
+        }), 200
+    
     # Get metadata from form
     try:
-        metadata_str = request.form.get('metadata', '{}')
-        metadata = json.loads(metadata_str)
-    except json.JSONDecodeError:
+        metadata = orjson.loads(metadata_target.value or b'{}')
+    except orjson.JSONDecodeError:
         logger.error("Invalid metadata JSON")
         metadata = {}
     
@@ -64,137 +355,196 @@ def upload_document():
     if 'source' not in metadata:
         metadata['source'] = 'Firm'
     
-    # Save uploaded file
-    upload_dir = 'data/uploads'
-    os.makedirs(upload_dir, exist_ok=True)
-    
     # Generate unique filename to avoid collisions
-    original_filename = file.filename
-    file_extension = os.path.splitext(original_filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    # The client's name may contain directories, so take the extension from
+    # the final path component only
+    unique_filename = secrets.token_hex(16) + os.path.splitext(original_filename)[1]
     
-    file_path = os.path.join(upload_dir, unique_filename)
-    file.save(file_path)
+    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    try:
+        os.replace(temp_path, file_path)
+    except OSError as e:
+        _discard_partial_upload(temp_path)
+        logger.error(f"Error saving upload {original_filename}: {str(e)}")
+        return jsonify({'error': 'Could not save upload'}), 500
     
     logger.info(f"File saved: {file_path}")
     
     # Save metadata
     metadata['original_filename'] = original_filename
-    metadata['upload_time'] = datetime.now().isoformat()
-    metadata['uploaded_by'] = request.form.get('user', 'unknown')
+    metadata['upload_time'] = now_iso()
+    metadata['uploaded_by'] = user_target.value.decode('utf-8', errors='replace') or 'unknown'
     
+    # Serialize once, compactly; the same bytes go to the sidecar and the DB
+    metadata_json = orjson.dumps(metadata)
     metadata_path = file_path + ".meta.json"
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    with open(metadata_path, 'wb') as f:
+        f.write(metadata_json)
     
-    # Process file
-    try:
-        logger.info(f"Processing file: {original_filename}")
-        processed_path = processor.process_file(file_path)
-        
-        if processed_path:
-            # Index the processed file
-            logger.info(f"Indexing file: {original_filename}")
-            success = indexer.index_document(processed_path)
-            
-            if success:
-                logger.info(f"Successfully processed and indexed: {original_filename}")
-                return jsonify({
-                    'success': True,
-                    'message': 'Document uploaded, processed, and indexed successfully',
-                    'original_filename': original_filename,
-                    'processed_path': processed_path
-                }), 200
+    with db_lock:
+        db_conn.execute(
+            'INSERT OR REPLACE INTO uploads '
+            '(filename, original_filename, upload_time, source, uploaded_by, metadata_json, content_hash) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (
+                unique_filename,
+                original_filename,
+                metadata['upload_time'],
+                metadata['source'],
+                metadata['uploaded_by'],
+                metadata_json.decode('utf-8'),
+                content_hash
+            )
+        )
+        db_conn.commit()
+    
+    # Queue processing and indexing on a background worker
+    job_id = secrets.token_hex(16)
+    with jobs_lock:
+        jobs[job_id] = {
+            'job_id': job_id,
+            'status': 'queued',
+            'original_filename': original_filename,
+            'created_at': now_iso()
+        }
+    executor.submit(_process_upload, job_id, file_path, original_filename)
+    
+    logger.info(f"Queued processing job {job_id} for: {original_filename}")
+    return jsonify({
+        'success': True,
+        'message': 'Document uploaded and queued for processing',
+        'job_id': job_id,
+        'status': 'queued',
+        'original_filename': original_filename
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of a background processing job"""
+    with jobs_lock:
+        job = jobs.get(job_id)
+        job = dict(job) if job else None
+    
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job), 200
+
+def _scan_directory(directory):
+    """Scan a directory once, splitting files into documents and sidecar metadata entries"""
+    documents = []
+    meta_entries = {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            if entry.name.endswith('.meta.json'):
+                meta_entries[entry.name] = entry
             else:
-                logger.error(f"Failed to index: {original_filename}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Document was processed but indexing failed',
-                    'original_filename': original_filename
-                }), 500
-        else:
-            logger.error(f"Failed to process: {original_filename}")
-            return jsonify({
-                'success': False,
-                'error': 'Failed to process document',
-                'original_filename': original_filename
-            }), 500
+                documents.append(entry)
+    return documents, meta_entries
+
+def _load_metadata(meta_entry):
+    """Load a sidecar metadata file, reusing the parsed copy while its mtime is unchanged"""
+    mtime = meta_entry.stat().st_mtime_ns
+    with metadata_cache_lock:
+        cached = metadata_cache.get(meta_entry.path)
+    if cached and cached[0] == mtime:
+        return cached[1]
     
-    except Exception as e:
-        logger.error(f"Error processing document {original_filename}: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': f'Error processing document: {str(e)}',
-            'original_filename': original_filename
-        }), 500
+    with open(meta_entry.path, 'rb') as f:
+        metadata = orjson.loads(f.read())
+    
+    with metadata_cache_lock:
+        metadata_cache[meta_entry.path] = (mtime, metadata)
+    return metadata
+
+def _documents_etag(processed_entries, processed_meta):
+    """Build a weak ETag for the document listing from upload rows and processed file mtimes"""
+    with db_lock:
+        upload_count, last_upload = db_conn.execute('SELECT COUNT(*), MAX(upload_time) FROM uploads').fetchone()
+    
+    last_processed = 0
+    for entry in processed_entries + list(processed_meta.values()):
+        last_processed = max(last_processed, entry.stat().st_mtime_ns)
+    
+    fingerprint = f"{upload_count}:{last_upload}:{len(processed_entries)}:{len(processed_meta)}:{last_processed}"
+    return hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest()
+
+def _add_cache_headers(response, etag):
+    """Attach the listing ETag and a short private cache lifetime to a response"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = f'private, max-age={DOCUMENTS_MAX_AGE}'
+    return response
 
 @app.route('/documents', methods=['GET'])
 def list_documents():
     """List uploaded and processed documents"""
     try:
-        uploads_dir = 'data/uploads'
         processed_dir = 'data/processed'
         
-        if not os.path.exists(uploads_dir) or not os.path.exists(processed_dir):
-            return jsonify({
-                'uploads': [],
-                'processed': []
-            }), 200
+        # One directory scan; sidecar existence is looked up in the scan
+        # results instead of with a stat per file
+        try:
+            processed_entries, processed_meta = _scan_directory(processed_dir)
+        except FileNotFoundError:
+            processed_entries, processed_meta = [], {}
+        
+        # Let polling clients skip unchanged listings before any JSON is built
+        etag = _documents_etag(processed_entries, processed_meta)
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            return _add_cache_headers(response, etag)
         
         # Get uploaded files with metadata
-        uploads = []
-        for filename in os.listdir(uploads_dir):
-            if filename.endswith('.meta.json'):
+        with db_lock:
+            rows = db_conn.execute(
+                'SELECT filename, original_filename, upload_time, source, uploaded_by '
+                'FROM uploads ORDER BY upload_time'
+            ).fetchall()
+        
+        uploads = [
+            {
+                'filename': filename,
+                'original_filename': original_filename,
+                'upload_time': upload_time,
+                'source': source,
+                'uploaded_by': uploaded_by
+            }
+            for filename, original_filename, upload_time, source, uploaded_by in rows
+        ]
+        
+        # Get processed files
+        processed = []
+        for entry in processed_entries:
+            filename = entry.name
+            if not filename.endswith('.processed.txt'):
                 continue
-                
-            metadata_path = os.path.join(uploads_dir, filename + ".meta.json")
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                    uploads.append({
-                        'filename': filename,
-                        'original_filename': metadata.get('original_filename', filename),
-                        'upload_time': metadata.get('upload_time', ''),
-                        'source': metadata.get('source', 'unknown'),
-                        'uploaded_by': metadata.get('uploaded_by', 'unknown')
-                    })
+            
+            meta_entry = processed_meta.get(filename + ".meta.json")
+            if meta_entry is not None:
+                metadata = _load_metadata(meta_entry)
+                processed.append({
+                    'filename': filename,
+                    'original_filename': metadata.get('original_filename', filename),
+                    'processed_at': metadata.get('processed_at', ''),
+                    'source': metadata.get('source', 'unknown'),
+                    'indexed': 'indexed_at' in metadata
+                })
             else:
-                uploads.append({
+                processed.append({
                     'filename': filename,
                     'original_filename': filename,
-                    'upload_time': '',
+                    'processed_at': '',
                     'source': 'unknown',
-                    'uploaded_by': 'unknown'
+                    'indexed': False
                 })
         
-        # Get processed files
-        processed = []
-        for filename in os.listdir(processed_dir):
-            if filename.endswith('.processed.txt'):
-                metadata_path = os.path.join(processed_dir, filename + ".meta.json")
-                if os.path.exists(metadata_path):
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                        processed.append({
-                            'filename': filename,
-                            'original_filename': metadata.get('original_filename', filename),
-                            'processed_at': metadata.get('processed_at', ''),
-                            'source': metadata.get('source', 'unknown'),
-                            'indexed': 'indexed_at' in metadata
-                        })
-                else:
-                    processed.append({
-                        'filename': filename,
-                        'original_filename': filename,
-                        'processed_at': '',
-                        'source': 'unknown',
-                        'indexed': False
-                    })
-        
-        return jsonify({
+        response = jsonify({
             'uploads': uploads,
             'processed': processed
-        }), 200
+        })
+        return _add_cache_headers(response, etag), 200
         
     except Exception as e:
         logger.error(f"Error listing documents: {str(e)}")
@@ -202,9 +552,11 @@ def list_documents():
             'error': f'Error listing documents: {str(e)}'
         }), 500
 
-def start_api(host='0.0.0.0', port=5005):
+def start_api(host='0.0.0.0', port=5005, threads=8):
     """Start the API server"""
-    app.run(host=host, port=port)
+    _init_db()
+    threading.Thread(target=_index_consumer, name='index_consumer', daemon=True).start()
+    serve(app, host=host, port=port, threads=threads)
 
 if __name__ == '__main__':
     # Set up file logging
@@ -5,14 +5,93 @@ This module handles downloading tax documents from various sources based on conf
 It supports PDF downloads, HTML scraping, and recursive link following.
 """
 
-import json
+import hashlib
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 import logging
 import urllib.parse
+import shutil
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.config import MAX_PDF_SIZE_MB, MAX_RETRIES
+from src.utils.timestamps import now_iso
+
+# Maximum number of documents fetched concurrently
+FETCH_WORKERS = 16
+
+# Maximum number of scraped links downloaded concurrently, across all pages
+LINK_DOWNLOAD_WORKERS = 8
+
+# Politeness limit for scraped link downloads, per host
+REQUESTS_PER_SECOND_PER_HOST = 4
+
+# Connection pool sizing for the shared session; link downloads share one
+# executor, so at most every fetch and link-download worker is in flight and
+# maxsize covers them all hitting the same host at once
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = FETCH_WORKERS + LINK_DOWNLOAD_WORKERS
+
+# Chunk size for streaming downloads to disk; large chunks keep the number of
+# read/write round trips through Python low for multi-megabyte PDFs
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Compiled XPath query for page text; script/style text is not page content
+PAGE_TEXT = etree.XPath('//text()[not(parent::script) and not(parent::style)]', smart_strings=False)
+
+def _build_link_filter(suffixes):
+    """Compile an XPath selecting link hrefs that end in one of the suffixes, ignoring case"""
+    if not suffixes:
+        return etree.XPath('//a/@href[false()]', smart_strings=False)
+    
+    # XPath 1.0 has no ends-with or lower-case, so compare a lowercased tail
+    href = "translate(normalize-space(.), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+    conditions = ' or '.join(
+        f"substring({href}, string-length(normalize-space(.)) - {len(suffix) - 1}) = '{suffix}'"
+        for suffix in suffixes
+    )
+    return etree.XPath(f'//a/@href[{conditions}]', smart_strings=False)
+
+def _download_filename(url):
+    """Name a download after the URL's last path segment plus a short hash of the whole URL"""
+    # Different URLs can share a basename; the hash keeps their files apart
+    name, ext = os.path.splitext(url.split('/')[-1])
+    url_hash = hashlib.blake2b(url.encode(), digest_size=4).hexdigest()
+    return f"{name or 'unnamed_file'}_{url_hash}{ext}"
+
+def _remove_partial(path):
+    """Remove a partially written download, if it was created"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class HostRateLimiter:
+    """Space out requests to each host at a fixed rate, shared across threads"""
+    
+    def __init__(self, requests_per_second):
+        """Initialize with the allowed request rate per host"""
+        self.interval = 1.0 / requests_per_second
+        self._next_slot = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url):
+        """Block until a request to the URL's host is allowed"""
+        host = urllib.parse.urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
 
 class DocumentFetcher:
     """Fetch tax documents from configured sources"""
@@ -20,8 +99,33 @@ class DocumentFetcher:
     def __init__(self, config_path='src/config/sources.json'):
         """Initialize with config path"""
         # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = json.load(f)
+        with open(config_path, 'rb') as f:
+            self.config = orjson.loads(f.read())
+        
+        # Suffixes used to pick downloadable links while scraping
+        self._allowed_ext_tuple = tuple('.' + ext.lower() for ext in self.config['fileTypes'])
+        # Filtering happens inside lxml, so non-matching links never reach Python
+        self._file_link_hrefs = _build_link_filter(self._allowed_ext_tuple)
+        
+        # Shared session so requests to the same host reuse connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=Retry(
+                total=MAX_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND_PER_HOST)
+        # One pool for the links of every scraped page, so concurrent pages
+        # do not multiply the number of downloads in flight
+        self._link_executor = ThreadPoolExecutor(max_workers=LINK_DOWNLOAD_WORKERS)
+        self._claim_lock = threading.Lock()
         
         # Set up download directory
         self.download_dir = 'data/downloads'
@@ -36,35 +140,56 @@ class DocumentFetcher:
             self.logger.addHandler(handler)
             self.logger.setLevel(logging.INFO)
     
-    def fetch_all_documents(self):
-        """Fetch all documents defined in the configuration"""
+    def fetch_all_documents(self, on_download=None):
+        """Fetch all documents defined in the configuration
+        
+        If given, on_download is called with each file path as soon as it is saved.
+        """
         self.logger.info("Starting to fetch all configured documents")
         
-        for doc in self.config['documents']:
-            try:
+        # URLs taken by any task in this run, so a file linked from several
+        # pages is downloaded and handed to on_download only once
+        seen_urls = set()
+        
+        # Documents are independent and network-bound, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            futures = {}
+            for doc in self.config['documents']:
                 self.logger.info(f"Fetching document: {doc['description']} from {doc['url']}")
-                self.fetch_document(doc)
-            except Exception as e:
-                self.logger.error(f"Error fetching document {doc['url']}: {str(e)}")
+                futures[executor.submit(self.fetch_document, doc, on_download, seen_urls)] = doc
+            
+            for future in as_completed(futures):
+                doc = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    self.logger.error(f"Error fetching document {doc['url']}: {str(e)}")
         
         self.logger.info("Completed fetching all documents")
         return True
     
-    def fetch_document(self, doc_config):
-        """Fetch a specific document based on its configuration"""
+    def fetch_document(self, doc_config, on_download=None, seen_urls=None):
+        """Fetch a specific document based on its configuration
+        
+        seen_urls holds the URLs already downloaded in the current run; files
+        in it are skipped.
+        """
         url = doc_config['url']
         doc_type = doc_config['type']
         source = doc_config['source']
+        if seen_urls is None:
+            seen_urls = set()
         
         self.logger.info(f"Processing {doc_type} from {url}")
         
         if doc_type == 'pdf':
-            self._download_pdf(url, source)
+            if self._claim_url(url, seen_urls):
+                self._notify(self._download_pdf(url, source), on_download)
         elif doc_type == 'html':
             if doc_config.get('recursive', False):
-                self._scrape_links(url, source)
+                self._scrape_links(url, source, on_download, seen_urls)
             else:
-                self._download_html(url, source)
+                self._notify(self._download_html(url, source), on_download)
         else:
             self.logger.warning(f"Unsupported document type: {doc_type}")
         
@@ -73,14 +198,20 @@ class DocumentFetcher:
     def _download_pdf(self, url, source):
         """Download a PDF file"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()  # Raise an error for bad responses
-            
-            filename = url.split('/')[-1]
-            filepath = os.path.join(self.download_dir, filename)
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            response = self.session.get(url, timeout=30, stream=True)
+            try:
+                response.raise_for_status()  # Raise an error for bad responses
+                
+                if self._exceeds_size_limit(response):
+                    self.logger.warning(f"Skipping PDF larger than {MAX_PDF_SIZE_MB} MB: {url}")
+                    return None
+                
+                filename = _download_filename(url)
+                filepath = os.path.join(self.download_dir, filename)
+                
+                self._save_response(response, filepath)
+            finally:
+                response.close()
             
             self.logger.info(f"Downloaded PDF: {filename}")
             
@@ -89,12 +220,12 @@ class DocumentFetcher:
             metadata = {
                 "source": source,
                 "url": url,
-                "downloaded_at": datetime.now().isoformat(),
+                "downloaded_at": now_iso(),
                 "file_type": "pdf"
             }
             
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
             
             return filepath
         
@@ -105,13 +236,13 @@ class DocumentFetcher:
     def _download_html(self, url, source):
         """Download HTML content"""
         try:
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            tree = lxml.html.fromstring(response.content)
             
             # Extract text content
-            text_content = soup.get_text(separator=' ', strip=True)
+            text_content = ' '.join(text.strip() for text in PAGE_TEXT(tree) if text.strip())
             
             # Generate filename from URL
             parsed_url = urllib.parse.urlparse(url)
@@ -140,12 +271,12 @@ class DocumentFetcher:
             metadata = {
                 "source": source,
                 "url": url,
-                "downloaded_at": datetime.now().isoformat(),
+                "downloaded_at": now_iso(),
                 "file_type": "html"
             }
             
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
             
             return filepath
         
@@ -153,41 +284,44 @@ class DocumentFetcher:
             self.logger.error(f"Error downloading HTML {url}: {str(e)}")
             return None
     
-    def _scrape_links(self, base_url, source):
+    def _scrape_links(self, base_url, source, on_download=None, seen_urls=None):
         """Recursively scrape links from a webpage"""
         try:
             self.logger.info(f"Scraping links from {base_url}")
             
-            response = requests.get(base_url, timeout=30)
+            response = self.session.get(base_url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            links = soup.find_all('a')
+            tree = lxml.html.fromstring(response.content)
             
-            # Keep track of downloaded files to avoid duplicates
-            downloaded_count = 0
+            # Scheme and host for resolving root-relative links without urljoin
+            base_parts = urllib.parse.urlsplit(base_url)
+            base_origin = f"{base_parts.scheme}://{base_parts.netloc}"
             
-            for link in links:
-                href = link.get('href')
-                if not href:
-                    continue
-                
-                # Filter for document types we want
-                allowed_extensions = self.config['fileTypes']
-                
-                # Check if href ends with any of the allowed extensions
-                is_allowed = any(href.lower().endswith('.' + ext.lower()) for ext in allowed_extensions)
+            # Collect matching links first; dict keeps order and drops duplicates
+            file_urls = {}
+            
+            # Only hrefs ending with an allowed extension are returned
+            for href in self._file_link_hrefs(tree):
+                href = href.strip()
                 
-                if is_allowed:
-                    # Make relative URLs absolute
+                # Make relative URLs absolute; urljoin is only needed for
+                # document-relative, protocol-relative or dot-segment paths
+                if href.startswith(('http://', 'https://')):
+                    full_url = href
+                elif href.startswith('/') and not href.startswith('//') and '/.' not in href:
+                    full_url = base_origin + href
+                else:
                     full_url = urllib.parse.urljoin(base_url, href)
-                    
-                    # Download the file
-                    self._download_file(full_url, source)
-                    downloaded_count += 1
-                    
-                    # Be nice to the server
-                    time.sleep(1)
+                file_urls[full_url] = None
+            
+            # Leave links another page in this run has already taken
+            if seen_urls is not None:
+                file_urls = [url for url in file_urls if self._claim_url(url, seen_urls)]
+            
+            # Download on the shared link pool; the per-host rate limiter keeps this polite
+            results = list(self._link_executor.map(lambda url: self._notify(self._download_file(url, source), on_download), file_urls))
+            downloaded_count = sum(1 for result in results if result)
             
             self.logger.info(f"Scraped and downloaded {downloaded_count} files from {base_url}")
             return True
@@ -199,18 +333,23 @@ class DocumentFetcher:
     def _download_file(self, url, source):
         """Download any file type"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Extract filename from URL
-            filename = url.split('/')[-1]
-            if not filename:
-                filename = 'unnamed_file_' + str(int(time.time()))
-            
-            filepath = os.path.join(self.download_dir, filename)
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            self.rate_limiter.wait(url)
+            response = self.session.get(url, timeout=30, stream=True)
+            try:
+                response.raise_for_status()
+                
+                if self._exceeds_size_limit(response):
+                    self.logger.warning(f"Skipping file larger than {MAX_PDF_SIZE_MB} MB: {url}")
+                    return None
+                
+                # Extract filename from URL
+                filename = _download_filename(url)
+                
+                filepath = os.path.join(self.download_dir, filename)
+                
+                self._save_response(response, filepath)
+            finally:
+                response.close()
             
             self.logger.info(f"Downloaded file: {filename}")
             
@@ -219,12 +358,12 @@ class DocumentFetcher:
             metadata = {
                 "source": source,
                 "url": url,
-                "downloaded_at": datetime.now().isoformat(),
+                "downloaded_at": now_iso(),
                 "file_type": os.path.splitext(filename)[1][1:] if '.' in filename else "unknown"
             }
             
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            with open(metadata_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
             
             return filepath
         
@@ -232,6 +371,45 @@ class DocumentFetcher:
             self.logger.error(f"Error downloading file {url}: {str(e)}")
             return None
 
+    def _claim_url(self, url, seen_urls):
+        """Take a URL for download, returning False if another task already has it"""
+        with self._claim_lock:
+            if url in seen_urls:
+                return False
+            seen_urls.add(url)
+            return True
+    
+    def _notify(self, filepath, on_download):
+        """Hand a downloaded file to the on_download callback, if there is one"""
+        if filepath and on_download:
+            on_download(filepath)
+        return filepath
+    
+    def _exceeds_size_limit(self, response):
+        """Check the advertised Content-Length against the download size limit"""
+        try:
+            content_length = int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            return False
+        return content_length > MAX_PDF_SIZE_MB * 1024 * 1024
+    
+    def _save_response(self, response, filepath):
+        """Stream a response body to disk without holding it in memory
+        
+        The body goes to a .part file that is renamed into place once complete,
+        so a failed download never leaves a truncated file under the real name.
+        """
+        temp_path = filepath + '.part'
+        try:
+            # Let urllib3 undo any gzip/deflate transfer encoding while streaming
+            response.raw.decode_content = True
+            with open(temp_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
+            os.replace(temp_path, filepath)
+        except Exception:
+            _remove_partial(temp_path)
+            raise
+
 # Simple test to run if this module is run directly
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
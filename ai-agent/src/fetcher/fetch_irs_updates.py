@@ -4,15 +4,23 @@ It monitors various IRS web pages for updates and downloads new documents for pr
 """
 
 import os
+import random
 import re
+import shutil
 import time
 import logging
 import hashlib
-import json
+import threading
 import urllib.parse
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from datetime import datetime
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+import lxml.html
+from lxml import etree
 import sys
 
 # Add parent directory to path
@@ -24,9 +32,60 @@ from src.config import (
     IRS_TAX_TOPICS_URL, US_TAX_COURT_URL, PDF_STORAGE_DIR, 
     METADATA_DIR, MAX_RETRIES, REQUEST_TIMEOUT
 )
+from src.utils.bloom import BloomFilter
 
 logger = logging.getLogger('ai_tax_agent.fetcher')
 
+# Number of source pages fetched at once; one worker per source
+SOURCE_FETCH_WORKERS = 3
+
+# Patterns and formats used per document, compiled once
+FILENAME_RE = re.compile(r'filename="?([^";]+)"?')
+SAFE_NAME_RE = re.compile(r'[^\w\-.]')
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%m/%d/%Y", "%Y-%m-%d")
+
+# Maximum number of PDFs downloaded at once
+DOWNLOAD_WORKERS = 16
+
+# Retry backoff ceiling, and the longest server-requested Retry-After honoured
+MAX_BACKOFF = 30
+MAX_RETRY_AFTER = 300
+
+# X-RateLimit-Reset values above this are epoch timestamps (2001 onwards);
+# smaller ones are a number of seconds
+RESET_EPOCH_THRESHOLD = 1e9
+
+# Sizing for the filter of every publication PDF seen so far
+SEEN_PUBLICATIONS_CAPACITY = 100000
+SEEN_PUBLICATIONS_ERROR_RATE = 1e-4
+
+# Connection pool size per host; covers every download worker at once so
+# connections are reused instead of evicted and re-handshaken
+POOL_SIZE = 32
+
+# Chunk size for streaming PDF bodies to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Chunk size for feeding the publications page to the incremental parser
+PARSE_CHUNK_SIZE = 8192
+
+# Compiled XPath queries for the listing pages; class tests match whole
+# class tokens, like BeautifulSoup's class_ filter
+NEWSROOM_ARTICLES = etree.XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' newsroom-article-item ')]"
+)
+TAX_COURT_OPINIONS = etree.XPath(
+    "//tr[contains(concat(' ', normalize-space(@class), ' '), ' opinionsItem ')]"
+)
+
+# Per-item lookups, compiled once instead of per call; each returns the
+# first match like BeautifulSoup's find()
+FIRST_HEADING = etree.XPath("(.//h4)[1]")
+FIRST_TIME = etree.XPath("(.//time)[1]")
+FIRST_LINK = etree.XPath("(.//a)[1]")
+FIRST_LINK_HREF = etree.XPath("(.//a)[1]/@href", smart_strings=False)
+TABLE_CELLS = etree.XPath(".//td")
+
 
 class IRSUpdateFetcher:
     """Class to fetch and monitor tax law updates from various sources."""
@@ -39,20 +98,45 @@ class IRSUpdateFetcher:
             'Accept': 'text/html,application/xhtml+xml,application/xml,application/pdf'
         })
         
+        # Retries are handled by _make_request, so the adapter doesn't retry
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
         # Create metadata directory if it doesn't exist
         os.makedirs(METADATA_DIR, exist_ok=True)
         self.last_fetch_file = os.path.join(METADATA_DIR, 'last_fetch.json')
         
-        # Load last fetch data
+        # Directory prefix for downloaded PDFs, built once so each download
+        # only appends its filename
+        os.makedirs(PDF_STORAGE_DIR, exist_ok=True)
+        self.pdf_path_prefix = os.path.join(PDF_STORAGE_DIR, '')
+        
+        # Load last fetch data; sources are fetched concurrently, so updates
+        # to it and the file it is saved to are serialized
         self.last_fetch_data = self._load_last_fetch_data()
+        self._last_fetch_lock = threading.Lock()
+        
+        # Earliest time (time.monotonic) each host may be contacted again,
+        # set when a host asks us to back off
+        self._host_not_before = {}
+        self._host_lock = threading.Lock()
+        
+        # Set view of each source's last_urls for constant-time membership checks
+        self._known_urls = {key: set(data['last_urls']) for key, data in self.last_fetch_data.items()}
+        
+        # The publications page lists thousands of PDFs; remember every one
+        # ever seen in a Bloom filter kept next to last_fetch.json
+        self.seen_publications_file = os.path.join(METADATA_DIR, 'seen_publications.bloom')
+        self.seen_publications = self._load_seen_publications()
     
     def _load_last_fetch_data(self):
         """Load data about the last fetch operation from disk."""
         if os.path.exists(self.last_fetch_file):
             try:
-                with open(self.last_fetch_file, 'r') as file:
-                    return json.load(file)
-            except (json.JSONDecodeError, IOError) as e:
+                with open(self.last_fetch_file, 'rb') as file:
+                    return orjson.loads(file.read())
+            except (orjson.JSONDecodeError, IOError) as e:
                 logger.error(f"Error loading last fetch data: {e}")
         
         # Return default data if file doesn't exist or has errors
@@ -64,19 +148,97 @@ class IRSUpdateFetcher:
             'tax_court': {'last_fetch': None, 'last_urls': []}
         }
     
+    def _load_seen_publications(self):
+        """Load the filter of seen publication URLs, or start an empty one."""
+        try:
+            bloom = BloomFilter.load(self.seen_publications_file)
+        except (ValueError, IOError) as e:
+            logger.error(f"Error loading seen publications filter: {e}")
+            bloom = None
+        
+        if bloom is None:
+            bloom = BloomFilter(SEEN_PUBLICATIONS_CAPACITY, SEEN_PUBLICATIONS_ERROR_RATE)
+        return bloom
+    
     def _save_last_fetch_data(self):
         """Save data about the current fetch operation to disk."""
+        # Write a temporary file and rename it over the old one, so a crash
+        # mid-write never leaves a truncated file behind
+        temp_file = self.last_fetch_file + '.tmp'
         try:
-            with open(self.last_fetch_file, 'w') as file:
-                json.dump(self.last_fetch_data, file, indent=2)
+            with open(temp_file, 'wb') as file:
+                file.write(orjson.dumps(self.last_fetch_data, option=orjson.OPT_INDENT_2))
+            os.replace(temp_file, self.last_fetch_file)
         except IOError as e:
             logger.error(f"Error saving last fetch data: {e}")
     
-    def _make_request(self, url, retries=MAX_RETRIES):
+    def _record_fetch(self, source_key, urls, response):
+        """Record the URLs and cache validators for a source, persisting them if they changed."""
+        with self._last_fetch_lock:
+            source_data = self.last_fetch_data[source_key]
+            known_urls = set(urls)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            
+            dirty = (
+                known_urls != self._known_urls[source_key]
+                or etag != source_data.get('etag')
+                or last_modified != source_data.get('last_modified')
+            )
+            
+            self._known_urls[source_key] = known_urls
+            source_data['last_urls'] = sorted(known_urls)
+            source_data['last_fetch'] = datetime.now().isoformat()
+            source_data['etag'] = etag
+            source_data['last_modified'] = last_modified
+            
+            # Skip the write when a poll found nothing new
+            if dirty:
+                self._save_last_fetch_data()
+    
+    def _record_publication_downloads(self, documents, results):
+        """Remember downloaded publications, and let failed ones be found again on the next fetch."""
+        downloaded = set()
+        failed = set()
+        for doc, metadata in zip(documents, results):
+            if doc.get('source') == 'IRS Publications':
+                (downloaded if metadata else failed).add(doc['link'])
+        
+        with self._last_fetch_lock:
+            # Publications go into the persisted filter only once they are on disk
+            added = [url for url in downloaded if self.seen_publications.add(url)]
+            if added:
+                try:
+                    self.seen_publications.save(self.seen_publications_file)
+                except IOError as e:
+                    logger.error(f"Error saving seen publications filter: {e}")
+            
+            if failed:
+                source_data = self.last_fetch_data['publications']
+                self._known_urls['publications'] -= failed
+                source_data['last_urls'] = sorted(self._known_urls['publications'])
+                # The listing may not change before the retry, so fetch it in full
+                source_data['etag'] = None
+                source_data['last_modified'] = None
+                self._save_last_fetch_data()
+    
+    def _conditional_headers(self, source_key):
+        """Build If-None-Match/If-Modified-Since headers from the last fetch of a source."""
+        source_data = self.last_fetch_data[source_key]
+        headers = {}
+        if source_data.get('etag'):
+            headers['If-None-Match'] = source_data['etag']
+        if source_data.get('last_modified'):
+            headers['If-Modified-Since'] = source_data['last_modified']
+        return headers
+    
+    def _make_request(self, url, retries=MAX_RETRIES, stream=False, headers=None):
         """Make an HTTP request with retries on failure."""
+        host = urllib.parse.urlparse(url).netloc
         for attempt in range(retries):
+            self._wait_for_host(host)
             try:
-                response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+                response = self.session.get(url, timeout=REQUEST_TIMEOUT, stream=stream, headers=headers)
                 response.raise_for_status()
                 return response
             except requests.RequestException as e:
@@ -84,40 +246,110 @@ class IRSUpdateFetcher:
                 if attempt == retries - 1:
                     logger.error(f"Failed to fetch {url} after {retries} attempts")
                     raise
-                time.sleep(2 ** attempt)  # Exponential backoff
+                
+                # Exponential backoff with jitter so concurrent workers don't
+                # retry in lockstep; a server-requested delay takes precedence
+                # and holds back every request to that host
+                delay = min(2 ** attempt + random.random(), MAX_BACKOFF)
+                retry_after = self._retry_after(e.response)
+                if retry_after is not None:
+                    self._defer_host(host, retry_after)
+                    delay = max(delay, retry_after)
+                if e.response is not None:
+                    e.response.close()
+                time.sleep(delay)
+    
+    def _retry_after(self, response):
+        """Return the delay in seconds a 429/5xx response asks for, or None."""
+        if response is None or (response.status_code != 429 and response.status_code < 500):
+            return None
+        
+        value = response.headers.get('Retry-After')
+        if value:
+            try:
+                delay = float(value)
+            except ValueError:
+                # HTTP-date form
+                try:
+                    delay = parsedate_to_datetime(value).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    return None
+            return min(max(delay, 0), MAX_RETRY_AFTER)
+        
+        # Reset may be an epoch timestamp or a number of seconds; an epoch
+        # already passed (e.g. from clock skew) means no wait
+        value = response.headers.get('X-RateLimit-Reset')
+        if value:
+            try:
+                reset = float(value)
+            except ValueError:
+                return None
+            delay = reset - time.time() if reset > RESET_EPOCH_THRESHOLD else reset
+            return min(max(delay, 0), MAX_RETRY_AFTER)
+        
+        return None
+    
+    def _defer_host(self, host, delay):
+        """Hold back all requests to a host for the given number of seconds."""
+        with self._host_lock:
+            not_before = time.monotonic() + delay
+            self._host_not_before[host] = max(not_before, self._host_not_before.get(host, 0))
+    
+    def _wait_for_host(self, host):
+        """Sleep until the host may be contacted again."""
+        with self._host_lock:
+            not_before = self._host_not_before.get(host, 0)
+        delay = not_before - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
     
     def _is_new_url(self, url, source_key):
         """Check if a URL is new and hasn't been processed before."""
-        return url not in self.last_fetch_data[source_key]['last_urls']
+        if source_key == 'publications' and url in self.seen_publications:
+            return False
+        return url not in self._known_urls[source_key]
     
     def _download_pdf(self, url, filename=None):
         """Download a PDF file and save it to disk."""
         try:
-            response = self._make_request(url)
+            # Stream the body so a large PDF is never held in memory
+            response = self._make_request(url, stream=True)
             
             # Generate filename if not provided
             if filename is None:
                 # Extract filename from URL or content disposition header
                 content_disposition = response.headers.get('Content-Disposition')
-                if content_disposition and 'filename=' in content_disposition:
-                    filename = re.findall('filename=(.+)', content_disposition)[0].strip('"\'')
+                filename_match = FILENAME_RE.search(content_disposition) if content_disposition else None
+                if filename_match:
+                    filename = filename_match.group(1).strip().strip("'")
                 else:
                     # Use the last part of the URL or hash if not available
                     url_path = urllib.parse.urlparse(url).path
                     filename = os.path.basename(url_path)
                     if not filename or len(filename) < 5:
-                        filename = f"{hashlib.md5(url.encode()).hexdigest()}.pdf"
+                        filename = f"{hashlib.blake2b(url.encode(), digest_size=8).hexdigest()}.pdf"
             
             # Ensure filename has .pdf extension
             if not filename.lower().endswith('.pdf'):
                 filename += '.pdf'
             
             # Create full path
-            filepath = os.path.join(PDF_STORAGE_DIR, filename)
+            filepath = self.pdf_path_prefix + filename
             
-            # Save the PDF
-            with open(filepath, 'wb') as file:
-                file.write(response.content)
+            # Save the PDF through a .part file, so a failed download never
+            # leaves a truncated PDF under the real name
+            temp_path = filepath + '.part'
+            try:
+                response.raw.decode_content = True
+                with open(temp_path, 'wb') as file:
+                    shutil.copyfileobj(response.raw, file, DOWNLOAD_CHUNK_SIZE)
+                os.replace(temp_path, filepath)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            finally:
+                response.close()
             
             logger.info(f"Downloaded PDF: {filename} from {url}")
             return filepath
@@ -130,9 +362,10 @@ class IRSUpdateFetcher:
         """Parse various date formats into a datetime object."""
         try:
             # Try various date formats
-            for date_format in ["%B %d, %Y", "%b %d, %Y", "%m/%d/%Y", "%Y-%m-%d"]:
+            date_str = date_str.strip()
+            for date_format in DATE_FORMATS:
                 try:
-                    return datetime.strptime(date_str.strip(), date_format)
+                    return datetime.strptime(date_str, date_format)
                 except ValueError:
                     continue
             
@@ -149,30 +382,35 @@ class IRSUpdateFetcher:
         logger.info(f"Fetching updates from IRS Newsroom: {IRS_NEWSROOM_URL}")
         
         try:
-            response = self._make_request(IRS_NEWSROOM_URL)
-            soup = BeautifulSoup(response.text, 'lxml')
+            # Conditional GET; an unchanged page comes back as an empty 304
+            response = self._make_request(IRS_NEWSROOM_URL, headers=self._conditional_headers('newsroom'))
+            if response.status_code == 304:
+                logger.info("IRS Newsroom unchanged since last fetch")
+                return []
+            
+            tree = lxml.html.fromstring(response.content)
             
             # Find all news items
             news_items = []
-            articles = soup.find_all("div", class_="newsroom-article-item")
             
             # Process each article
-            for article in articles:
+            for article in NEWSROOM_ARTICLES(tree):
                 try:
                     # Extract article details
-                    title_elem = article.find("h4")
-                    title = title_elem.text.strip() if title_elem else "No title"
+                    title_elems = FIRST_HEADING(article)
+                    title_elem = title_elems[0] if title_elems else None
+                    title = title_elem.text_content().strip() if title_elem is not None else "No title"
                     
-                    link_elem = title_elem.find("a") if title_elem else None
-                    link = link_elem['href'] if link_elem and 'href' in link_elem.attrs else None
+                    hrefs = FIRST_LINK_HREF(title_elem) if title_elem is not None else []
+                    link = hrefs[0] if hrefs else None
                     
                     # Make sure link is absolute
                     if link and not link.startswith('http'):
                         link = urllib.parse.urljoin(IRS_NEWSROOM_URL, link)
                     
                     # Extract date
-                    date_elem = article.find("time")
-                    date_str = date_elem.text.strip() if date_elem else None
+                    date_texts = FIRST_TIME(article)
+                    date_str = date_texts[0].text_content().strip() if date_texts else None
                     date = self._parse_date(date_str) if date_str else datetime.now()
                     
                     # Only process new articles
@@ -188,9 +426,7 @@ class IRSUpdateFetcher:
             
             # Update last fetch data
             current_urls = [item['link'] for item in news_items]
-            self.last_fetch_data['newsroom']['last_urls'] = current_urls
-            self.last_fetch_data['newsroom']['last_fetch'] = datetime.now().isoformat()
-            self._save_last_fetch_data()
+            self._record_fetch('newsroom', current_urls, response)
             
             logger.info(f"Found {len(news_items)} new items in IRS Newsroom")
             return news_items
@@ -204,24 +440,28 @@ class IRSUpdateFetcher:
         logger.info(f"Fetching opinions from US Tax Court: {US_TAX_COURT_URL}")
         
         try:
-            response = self._make_request(US_TAX_COURT_URL)
-            soup = BeautifulSoup(response.text, 'lxml')
+            # Conditional GET; an unchanged page comes back as an empty 304
+            response = self._make_request(US_TAX_COURT_URL, headers=self._conditional_headers('tax_court'))
+            if response.status_code == 304:
+                logger.info("US Tax Court unchanged since last fetch")
+                return []
+            
+            tree = lxml.html.fromstring(response.content)
             
             # Find all opinion items
             opinions = []
-            opinion_elements = soup.find_all("tr", class_="opinionsItem")
             
             # Process each opinion
-            for opinion in opinion_elements:
+            for opinion in TAX_COURT_OPINIONS(tree):
                 try:
                     # Extract opinion details
-                    cells = opinion.find_all("td")
+                    cells = TABLE_CELLS(opinion)
                     if len(cells) >= 3:
-                        date_str = cells[0].text.strip()
-                        name = cells[1].text.strip()
+                        date_str = cells[0].text_content().strip()
+                        name = cells[1].text_content().strip()
                         
-                        link_elem = cells[2].find("a")
-                        link = link_elem['href'] if link_elem and 'href' in link_elem.attrs else None
+                        hrefs = FIRST_LINK_HREF(cells[2])
+                        link = hrefs[0] if hrefs else None
                         
                         # Make sure link is absolute
                         if link and not link.startswith('http'):
@@ -241,9 +481,7 @@ class IRSUpdateFetcher:
             
             # Update last fetch data
             current_urls = [item['link'] for item in opinions]
-            self.last_fetch_data['tax_court']['last_urls'] = current_urls
-            self.last_fetch_data['tax_court']['last_fetch'] = datetime.now().isoformat()
-            self._save_last_fetch_data()
+            self._record_fetch('tax_court', current_urls, response)
             
             logger.info(f"Found {len(opinions)} new opinions in US Tax Court")
             return opinions
@@ -257,44 +495,31 @@ class IRSUpdateFetcher:
         logger.info(f"Fetching publications from IRS: {IRS_PUBLICATIONS_URL}")
         
         try:
-            response = self._make_request(IRS_PUBLICATIONS_URL)
-            soup = BeautifulSoup(response.text, 'lxml')
+            # Conditional GET; an unchanged page comes back as an empty 304
+            response = self._make_request(
+                IRS_PUBLICATIONS_URL, stream=True, headers=self._conditional_headers('publications')
+            )
+            if response.status_code == 304:
+                response.close()
+                logger.info("IRS Publications unchanged since last fetch")
+                return []
             
-            # Find all publication items
+            # The page is a long flat list of items, so parse it incrementally
+            # as it downloads and free each item once it has been handled
             publications = []
-            pub_elements = soup.find_all("div", class_="field-item")
-            
-            # Process each publication
-            for pub in pub_elements:
-                try:
-                    # Extract publication details
-                    link_elem = pub.find("a")
-                    if not link_elem or 'href' not in link_elem.attrs:
-                        continue
-                    
-                    link = link_elem['href']
-                    title = link_elem.text.strip()
-                    
-                    # Make sure link is absolute
-                    if not link.startswith('http'):
-                        link = urllib.parse.urljoin(IRS_PUBLICATIONS_URL, link)
-                    
-                    # Only process PDF links that are new
-                    if link.endswith('.pdf') and self._is_new_url(link, 'publications'):
-                        publications.append({
-                            'title': title,
-                            'link': link,
-                            'date': datetime.now().strftime("%Y-%m-%d"),  # Use current date as fallback
-                            'source': 'IRS Publications'
-                        })
-                except Exception as e:
-                    logger.error(f"Error processing IRS publication: {e}")
+            parser = etree.HTMLPullParser(events=('end',), tag='div', encoding=self._declared_encoding(response))
+            try:
+                for chunk in response.iter_content(PARSE_CHUNK_SIZE):
+                    parser.feed(chunk)
+                    self._collect_publications(parser, publications)
+                parser.close()
+                self._collect_publications(parser, publications)
+            finally:
+                response.close()
             
             # Update last fetch data
             current_urls = [item['link'] for item in publications]
-            self.last_fetch_data['publications']['last_urls'] = current_urls
-            self.last_fetch_data['publications']['last_fetch'] = datetime.now().isoformat()
-            self._save_last_fetch_data()
+            self._record_fetch('publications', current_urls, response)
             
             logger.info(f"Found {len(publications)} new IRS publications")
             return publications
@@ -303,28 +528,81 @@ class IRSUpdateFetcher:
             logger.error(f"Error fetching IRS publications: {e}")
             return []
     
+    def _declared_encoding(self, response):
+        """Return the charset from the Content-Type header, or None to let the parser detect it."""
+        if 'charset=' in response.headers.get('Content-Type', ''):
+            return response.encoding
+        return None
+    
+    def _collect_publications(self, parser, publications):
+        """Handle publication items completed by the incremental parser so far."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        for _, pub in parser.read_events():
+            if 'field-item' not in pub.get('class', '').split():
+                continue
+            
+            try:
+                # Extract publication details
+                link_elems = FIRST_LINK(pub)
+                if not link_elems or 'href' not in link_elems[0].attrib:
+                    continue
+                
+                link_elem = link_elems[0]
+                link = link_elem.get('href')
+                title = ''.join(link_elem.itertext()).strip()
+                
+                # Make sure link is absolute
+                if not link.startswith('http'):
+                    link = urllib.parse.urljoin(IRS_PUBLICATIONS_URL, link)
+                
+                # Only process PDF links that are new
+                if link.endswith('.pdf') and self._is_new_url(link, 'publications'):
+                    publications.append({
+                        'title': title,
+                        'link': link,
+                        'date': today,  # Use current date as fallback
+                        'source': 'IRS Publications'
+                    })
+            except Exception as e:
+                logger.error(f"Error processing IRS publication: {e}")
+            finally:
+                # Drop the handled item and everything before it
+                pub.clear()
+                while pub.getprevious() is not None:
+                    del pub.getparent()[0]
+    
+    def _download_document(self, doc, today):
+        """Download a single document, returning its metadata or None."""
+        try:
+            if 'link' in doc and doc['link'].endswith('.pdf'):
+                # Generate a filename from the document title; the link hash keeps
+                # same-titled documents downloaded concurrently from sharing a file
+                safe_title = SAFE_NAME_RE.sub('_', doc['title'])
+                link_hash = hashlib.blake2b(doc['link'].encode(), digest_size=4).hexdigest()
+                filename = f"{safe_title}_{today}_{link_hash}.pdf"
+                
+                # Download the PDF
+                pdf_path = self._download_pdf(doc['link'], filename)
+                
+                if pdf_path:
+                    # Store metadata about the downloaded document
+                    metadata = doc.copy()
+                    metadata['local_path'] = pdf_path
+                    metadata['download_date'] = datetime.now().isoformat()
+                    return metadata
+        except Exception as e:
+            logger.error(f"Error downloading document {doc.get('title', 'Unknown')}: {e}")
+        return None
+    
     def download_documents(self, documents):
         """Download documents (PDFs) from the provided list."""
-        downloaded = []
+        # Downloads are network-bound, so run them on a bounded pool
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            today = datetime.now().strftime('%Y%m%d')
+            results = list(executor.map(self._download_document, documents, repeat(today)))
+            downloaded = [metadata for metadata in results if metadata]
         
-        for doc in documents:
-            try:
-                if 'link' in doc and doc['link'].endswith('.pdf'):
-                    # Generate a filename from the document title
-                    safe_title = re.sub(r'[^\w\-.]', '_', doc['title'])
-                    filename = f"{safe_title}_{datetime.now().strftime('%Y%m%d')}.pdf"
-                    
-                    # Download the PDF
-                    pdf_path = self._download_pdf(doc['link'], filename)
-                    
-                    if pdf_path:
-                        # Store metadata about the downloaded document
-                        metadata = doc.copy()
-                        metadata['local_path'] = pdf_path
-                        metadata['download_date'] = datetime.now().isoformat()
-                        downloaded.append(metadata)
-            except Exception as e:
-                logger.error(f"Error downloading document {doc.get('title', 'Unknown')}: {e}")
+        self._record_publication_downloads(documents, results)
         
         logger.info(f"Downloaded {len(downloaded)} documents")
         return downloaded
@@ -333,10 +611,12 @@ class IRSUpdateFetcher:
         """Fetch updates from all sources and download new documents."""
         all_updates = []
         
-        # Fetch from various sources
-        all_updates.extend(self.fetch_irs_newsroom())
-        all_updates.extend(self.fetch_tax_court_opinions())
-        all_updates.extend(self.fetch_irs_publications())
+        # Fetch from various sources concurrently; each is a blocking page
+        # request, so total time is the slowest source rather than the sum
+        sources = [self.fetch_irs_newsroom, self.fetch_tax_court_opinions, self.fetch_irs_publications]
+        with ThreadPoolExecutor(max_workers=SOURCE_FETCH_WORKERS) as executor:
+            for updates in executor.map(lambda fetch: fetch(), sources):
+                all_updates.extend(updates)
         
         # Download new documents
         downloaded_docs = self.download_documents(all_updates)
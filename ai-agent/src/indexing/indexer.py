@@ -5,13 +5,15 @@ This module handles sending processed documents to the RAG system for indexing.
 It communicates with the RAG API to update the knowledge base.
 """
 
+import orjson
 import requests
 import os
-import json
 import logging
+from collections import Counter
 from datetime import datetime
-import time
-import glob
+
+# Number of documents sent to the RAG API per batch request
+INDEX_BATCH_SIZE = 32
 
 class DocumentIndexer:
     """Index processed tax documents in the RAG system"""
@@ -19,9 +21,11 @@ class DocumentIndexer:
     def __init__(self, rag_api_url='http://localhost:5000/rag/index'):
         """Initialize with RAG API URL"""
         self.rag_api_url = rag_api_url
+        self.rag_batch_url = f"{rag_api_url}/batch"
         self.processed_dir = 'data/processed'
         self.stats_dir = 'data/stats'
         os.makedirs(self.stats_dir, exist_ok=True)
+        self.stats_file = os.path.join(self.stats_dir, 'index_stats.json')
         
         # Set up logging
         self.logger = logging.getLogger('document_indexer')
@@ -40,50 +44,90 @@ class DocumentIndexer:
         
         self.logger.info(f"Starting indexing for {len(file_paths)} documents")
         indexed_files = []
+        indexed_metadata = []
         
-        for file_path in file_paths:
+        # One request per batch
+        for start in range(0, len(file_paths), INDEX_BATCH_SIZE):
+            batch = file_paths[start:start + INDEX_BATCH_SIZE]
             try:
-                result = self.index_document(file_path)
-                if result:
+                for file_path, metadata in self._index_batch(batch):
                     indexed_files.append(file_path)
-                # Be nice to the RAG API
-                time.sleep(1)
+                    indexed_metadata.append(metadata)
             except Exception as e:
-                self.logger.error(f"Error indexing {file_path}: {str(e)}")
+                self.logger.error(f"Error indexing batch of {len(batch)} documents: {str(e)}")
         
-        # Update index stats
+        # Update index stats from the metadata already loaded for the payloads
         if indexed_files:
-            self._update_index_stats(indexed_files)
+            self._update_index_stats(indexed_files, indexed_metadata)
         
         self.logger.info(f"Successfully indexed {len(indexed_files)} documents")
         return indexed_files
     
+    def _index_batch(self, file_paths):
+        """Index a batch of documents with a single RAG API request, returning (path, metadata) pairs"""
+        payloads = []
+        indexed = []
+        for file_path in file_paths:
+            try:
+                payload = self._build_payload(file_path)
+            except Exception as e:
+                self.logger.error(f"Error indexing {file_path}: {str(e)}")
+                continue
+            if payload:
+                payloads.append(payload)
+                indexed.append((file_path, payload['metadata']))
+        
+        if not payloads:
+            return []
+        
+        # Send to RAG API
+        self.logger.info(f"Sending batch of {len(payloads)} documents to RAG API")
+        
+        # TODO: POST {'documents': payloads} to self.rag_batch_url when the RAG API
+        # is available, pacing requests by its rate-limit response headers
+        
+        # For testing/development, simulate success
+        self.logger.info(f"Successfully indexed batch (simulated): {len(payloads)} documents")
+        return indexed
+    
+    def _build_payload(self, file_path):
+        """Build the RAG API payload for a document, or None if it should be skipped"""
+        # Check if document exists; a zero-byte file is empty without reading it
+        try:
+            size = os.stat(file_path).st_size
+        except FileNotFoundError:
+            self.logger.error(f"File not found: {file_path}")
+            return None
+        
+        if size == 0:
+            self.logger.warning(f"Empty document, skipping: {file_path}")
+            return None
+        
+        # Read document content
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        
+        # Skip whitespace-only documents without building a stripped copy
+        if content.isspace():
+            self.logger.warning(f"Empty document, skipping: {file_path}")
+            return None
+        
+        # Get metadata if available
+        metadata = self._get_metadata(file_path)
+        
+        # Prepare payload for RAG API
+        return {
+            'content': content,
+            'metadata': metadata
+        }
+    
     def index_document(self, file_path):
         """Index a single document in the RAG system"""
         try:
-            # Check if document exists
-            if not os.path.exists(file_path):
-                self.logger.error(f"File not found: {file_path}")
+            payload = self._build_payload(file_path)
+            if not payload:
                 return False
             
-            # Get metadata if available
-            metadata = self._get_metadata(file_path)
-            
-            # Read document content
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-            
-            # Skip empty documents
-            if not content.strip():
-                self.logger.warning(f"Empty document, skipping: {file_path}")
-                return False
-            
-            # Prepare payload for RAG API
-            payload = {
-                'content': content,
-                'metadata': metadata
-            }
-            
             # Send to RAG API
             self.logger.info(f"Sending document to RAG API: {os.path.basename(file_path)}")
             
@@ -108,10 +152,11 @@ class DocumentIndexer:
         """Get metadata for a document"""
         meta_path = file_path + ".meta.json"
         
-        if os.path.exists(meta_path):
-            with open(meta_path, 'r') as f:
-                metadata = json.load(f)
-        else:
+        # Open directly rather than checking existence first
+        try:
+            with open(meta_path, 'rb') as f:
+                metadata = orjson.loads(f.read())
+        except FileNotFoundError:
             # Create basic metadata if not available
             filename = os.path.basename(file_path)
             metadata = {
@@ -126,15 +171,15 @@ class DocumentIndexer:
         
         return metadata
     
-    def _update_index_stats(self, indexed_files):
+    def _update_index_stats(self, indexed_files, indexed_metadata):
         """Update index statistics"""
-        stats_file = os.path.join(self.stats_dir, 'index_stats.json')
+        stats_file = self.stats_file
         
         # Load existing stats or create new
-        if os.path.exists(stats_file):
-            with open(stats_file, 'r') as f:
-                stats = json.load(f)
-        else:
+        try:
+            with open(stats_file, 'rb') as f:
+                stats = orjson.loads(f.read())
+        except FileNotFoundError:
             stats = {
                 "total_documents": 0,
                 "last_update": "",
@@ -146,31 +191,39 @@ class DocumentIndexer:
         stats["last_update"] = timestamp
         stats["total_documents"] += len(indexed_files)
         
-        # Update document type counts
-        for file_path in indexed_files:
-            meta_path = file_path + ".meta.json"
-            if os.path.exists(meta_path):
-                with open(meta_path, 'r') as f:
-                    metadata = json.load(f)
-                
-                doc_type = metadata.get("file_type", "unknown")
-                if doc_type in stats["document_types"]:
-                    stats["document_types"][doc_type] += 1
-                else:
-                    stats["document_types"][doc_type] = 1
-        
-        # Save updated stats
-        with open(stats_file, 'w') as f:
-            json.dump(stats, f, indent=2)
+        # Update document type counts from the metadata loaded for indexing,
+        # without re-reading any sidecar files
+        type_counts = Counter(metadata.get("file_type", "unknown") for metadata in indexed_metadata)
+        document_types = stats["document_types"]
+        for doc_type, count in type_counts.items():
+            document_types[doc_type] = document_types.get(doc_type, 0) + count
+        
+        # Save updated stats through a temporary file, so a crash mid-write
+        # never leaves a truncated stats file
+        temp_file = stats_file + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(orjson.dumps(stats, option=orjson.OPT_INDENT_2))
+        os.replace(temp_file, stats_file)
         
         self.logger.info(f"Updated index stats: {len(indexed_files)} new documents, {stats['total_documents']} total")
     
+    def list_processed_files(self):
+        """List processed documents with a single directory scan"""
+        try:
+            with os.scandir(self.processed_dir) as it:
+                return [
+                    entry.path for entry in it
+                    if entry.name.endswith('.processed.txt') and not entry.name.startswith('.') and entry.is_file()
+                ]
+        except FileNotFoundError:
+            return []
+    
     def rebuild_index(self):
         """Rebuild the entire index with all processed documents"""
         self.logger.info("Starting full index rebuild")
         
         # Get all processed files
-        processed_files = glob.glob(os.path.join(self.processed_dir, "*.processed.txt"))
+        processed_files = self.list_processed_files()
         
         if not processed_files:
             self.logger.info("No processed files found for indexing")
@@ -192,7 +245,7 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     indexer = DocumentIndexer()
     # Find processed files
-    processed_files = glob.glob(os.path.join('data/processed', "*.processed.txt"))
+    processed_files = indexer.list_processed_files()
     if processed_files:
         indexer.index_documents(processed_files)
     else:
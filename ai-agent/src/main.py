@@ -8,6 +8,7 @@ that maintains the RAG database with tax law information.
 import logging
 import argparse
 import os
+import queue
 import sys
 import threading
 import time
@@ -21,6 +22,12 @@ from src.indexing.indexer import DocumentIndexer
 from src.monitoring.health_check import HealthMonitor
 from src.api.upload_api import start_api
 
+# Number of threads processing downloaded files while fetching continues
+PIPELINE_PROCESS_WORKERS = 4
+
+# Largest batch of processed files handed to the indexer at once
+PIPELINE_INDEX_BATCH_SIZE = 32
+
 def setup_logging():
     """Set up logging configuration"""
     log_dir = 'logs'
@@ -50,6 +57,79 @@ def start_upload_api_thread(port=5005):
     logging.info(f"Upload API started on port {port}")
     return api_thread
 
+def run_pipeline(fetcher, processor, indexer):
+    """Fetch, process and index documents with the three stages overlapping
+    
+    Downloads are queued for processing as soon as they land and processed
+    files are indexed in batches while the rest are still being fetched.
+    Returns the number of processed and indexed files.
+    """
+    logger = logging.getLogger('main')
+    process_queue = queue.Queue()
+    index_queue = queue.Queue()
+    processed_files = []
+    indexed_files = []
+    
+    def process_worker():
+        while True:
+            file_path = process_queue.get()
+            if file_path is None:
+                break
+            if file_path.endswith('.meta.json'):
+                continue
+            try:
+                processed_path = processor.process_downloaded_file(file_path)
+            except Exception as e:
+                logger.error(f"Error processing {file_path}: {str(e)}")
+                continue
+            if processed_path:
+                processed_files.append(processed_path)
+                index_queue.put(processed_path)
+    
+    def index_worker():
+        done = False
+        while not done:
+            # Block for the first file, then take whatever else is already waiting
+            batch = [index_queue.get()]
+            while len(batch) < PIPELINE_INDEX_BATCH_SIZE:
+                try:
+                    batch.append(index_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                done = True
+                batch = [path for path in batch if path is not None]
+            if batch:
+                indexed_files.extend(indexer.index_documents(batch))
+    
+    process_threads = [threading.Thread(target=process_worker, daemon=True) for _ in range(PIPELINE_PROCESS_WORKERS)]
+    index_thread = threading.Thread(target=index_worker, daemon=True)
+    for thread in process_threads:
+        thread.start()
+    index_thread.start()
+    
+    try:
+        fetcher.fetch_all_documents(on_download=process_queue.put)
+    finally:
+        for _ in process_threads:
+            process_queue.put(None)
+        for thread in process_threads:
+            thread.join()
+    
+    # Pick up anything downloaded earlier that has not been queued in this run;
+    # the processing workers have finished, so processed_files is complete
+    seen = set(processed_files)
+    try:
+        for processed_path in processor.process_new_files():
+            if processed_path not in seen:
+                seen.add(processed_path)
+                index_queue.put(processed_path)
+    finally:
+        index_queue.put(None)
+        index_thread.join()
+    
+    return len(seen), len(indexed_files)
+
 def main():
     """Main entry point"""
     setup_logging()
@@ -106,13 +186,11 @@ def main():
     if args.fetch_now:
         logger.info("Fetching documents immediately")
         try:
-            fetcher.fetch_all_documents()
-            processed_files = processor.process_new_files()
+            processed_count, indexed_count = run_pipeline(fetcher, processor, indexer)
             
-            if processed_files:
-                logger.info(f"Processing complete. {len(processed_files)} files processed.")
-                indexer.index_documents(processed_files)
-                logger.info("Indexing complete.")
+            if processed_count:
+                logger.info(f"Processing complete. {processed_count} files processed.")
+                logger.info(f"Indexing complete. {indexed_count} files indexed.")
             else:
                 logger.info("No new files to process.")
         except Exception as e:
@@ -15,7 +15,9 @@ Usage:
 """
 
 import argparse
+import asyncio
 import datetime
+import functools
 import json
 import logging
 import os
@@ -23,10 +25,19 @@ import random
 import re
 import requests
 import sqlite3
+import sys
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple, Union
 
+import ahocorasick
+import httpx
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,13 +52,170 @@ logger = logging.getLogger("ai_audit")
 # Configuration
 DEFAULT_CONFIG = {
     "api_endpoint": "http://localhost:8080/api/query",
+    "batch_api_endpoint": "http://localhost:8080/api/query_batch",
+    "query_batch_size": 8,  # Queries sent per batch request
     "db_path": "../../../database/tax_laws.db",
     "test_sets_path": "../../../tests/accuracy_tests/",
     "report_path": "../../../reports/accuracy/",
     "threshold_score": 0.75,  # Minimum acceptable accuracy score (0-1)
+    "max_concurrency": 16,  # Maximum number of queries in flight at once
+    "max_requests_per_second": 2,  # Rate cap on queries sent to the AI system
+    "async_query_threshold": 200,  # Test sets larger than this are queried with asyncio instead of threads
+    "parallel_evaluation_threshold": 500,  # Test sets larger than this are scored in worker processes
     "alert_recipients": ["admin@example.com"]
 }
 
+# Rounds of random rowid picks made before topping a short sample up with a
+# full random sort, for tables whose rowids have large gaps
+ROWID_SAMPLING_ROUNDS = 5
+
+# Rowids fetched per IN (...) query, below SQLite's bound parameter limit
+ROWID_FETCH_CHUNK = 500
+
+# Text following a citing phrase, and the contents of <cite> tags
+CITATION_CONTEXT_RE = re.compile(r'(?:cited|according to|based on|from|in)\s+([^.\n]{0,200})', re.IGNORECASE)
+CITE_TAG_RE = re.compile(r'<cite[^>]*>([^<]*)</cite>', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def _build_automaton(patterns):
+    """Build an Aho-Corasick automaton matching any of the given non-empty strings"""
+    automaton = ahocorasick.Automaton()
+    for pattern in patterns:
+        automaton.add_word(pattern, pattern)
+    automaton.make_automaton()
+    return automaton
+
+
+def _find_substrings(patterns, text):
+    """Return the set of patterns that occur in text, scanning it once"""
+    # The empty string is in every text but cannot be added to an automaton
+    found = {pattern for pattern in patterns if not pattern}
+    patterns = tuple(sorted(set(patterns) - found))
+    if patterns:
+        found.update(pattern for _, pattern in _build_automaton(patterns).iter(text))
+    return found
+
+
+@functools.lru_cache(maxsize=32)
+def _load_test_set_file(path, mtime_ns):
+    """Parse a test set file, cached per modification time so edits are picked up"""
+    with open(path, 'rb') as f:
+        test_set = orjson.loads(f.read())
+    
+    # Lowercase the expectations once here rather than on every evaluation
+    for test in test_set.get("tests", []):
+        test["_expected_content_lower"] = [sys.intern(item.lower()) for item in test.get("expected_content", [])]
+        test["_expected_citations_lower"] = [sys.intern(citation.lower()) for citation in test.get("expected_citations", [])]
+    return test_set
+
+
+def _evaluate_accuracy(response, expected_content, response_lower=None, expected_lower=None):
+    """Evaluate the accuracy of the AI response against expected content
+    
+    response_lower and expected_lower may be passed when the caller already
+    lowercased the response or the expected content.
+    """
+    if not response:
+        return 0.0, ["Failed to get valid response from AI"]
+    
+    # Count how many expected content items are present in the response,
+    # matching all of them in a single pass over the response
+    found_items = 0
+    errors = []
+    if expected_lower is None:
+        expected_lower = [item.lower() for item in expected_content]
+    if response_lower is None:
+        response_lower = response.lower()
+    found = _find_substrings(expected_lower, response_lower)
+    
+    for item, item_lower in zip(expected_content, expected_lower):
+        if item_lower in found:
+            found_items += 1
+        else:
+            errors.append(f"Missing expected content: {item}")
+    
+    if not expected_content:
+        return 1.0, []  # No expected content specified
+    
+    accuracy = found_items / len(expected_content)
+    return accuracy, errors
+
+
+def _evaluate_citations(response, expected_citations, response_lower=None, citations_lower=None):
+    """Evaluate the citation accuracy in the AI response
+    
+    response_lower and citations_lower may be passed when the caller already
+    lowercased the response or the expected citations.
+    """
+    if not response:
+        return 0.0, ["Failed to get valid response from AI"]
+    
+    # Count how many expected citations are present in the response
+    found_citations = 0
+    errors = []
+    if citations_lower is None:
+        citations_lower = [citation.lower() for citation in expected_citations]
+    if response_lower is None:
+        response_lower = response.lower()
+    found = _find_substrings(citations_lower, response_lower)
+    
+    # Look in citing phrases and <cite> tags for the citations not found
+    # literally, collecting them in one scan of the original response;
+    # casefold also matches spellings that lower() alone misses
+    missing = [
+        citation for citation, citation_lower in zip(expected_citations, citations_lower)
+        if citation_lower not in found
+    ]
+    if missing:
+        contexts = [
+            match.group(1).casefold()
+            for pattern in (CITATION_CONTEXT_RE, CITE_TAG_RE)
+            for match in pattern.finditer(response)
+        ]
+        for citation in missing:
+            citation_folded = citation.casefold()
+            if any(citation_folded in context for context in contexts):
+                found.add(citation.lower())
+    
+    for citation, citation_lower in zip(expected_citations, citations_lower):
+        if citation_lower in found:
+            found_citations += 1
+        else:
+            errors.append(f"Missing expected citation: {citation}")
+    
+    if not expected_citations:
+        return 1.0, []  # No expected citations specified
+    
+    citation_score = found_citations / len(expected_citations)
+    return citation_score, errors
+
+
+def _score_response(test, ok, response):
+    """Score an AI response for a test as (accuracy, accuracy errors, citation score, citation errors)
+    
+    Depends only on its arguments, so it can run in a worker process.
+    """
+    if not ok:
+        # The query failed, so there is nothing to evaluate
+        return 0.0, ["Failed to get valid response from AI"], 0.0, ["Failed to get valid response from AI"]
+    
+    # Both evaluations match against the lowercased response
+    response_lower = response.lower()
+    
+    # Evaluate accuracy
+    accuracy_score, accuracy_errors = _evaluate_accuracy(
+        response, test.get("expected_content", []), response_lower,
+        test.get("_expected_content_lower")
+    )
+    
+    # Evaluate citations
+    citation_score, citation_errors = _evaluate_citations(
+        response, test.get("expected_citations", []), response_lower,
+        test.get("_expected_citations_lower")
+    )
+    return accuracy_score, accuracy_errors, citation_score, citation_errors
+
 
 @dataclass
 class TestResult:
@@ -60,7 +228,43 @@ class TestResult:
     accuracy_score: float
     citation_score: float
     errors: List[str]
-    timestamp: str = datetime.datetime.now().isoformat()
+    # Taken when each result is created; formatted only when it is saved
+    timestamp_ns: int = field(default_factory=time.time_ns)
+    
+    @property
+    def timestamp(self):
+        """Local ISO 8601 time the result was created, like the stored rows"""
+        return datetime.datetime.fromtimestamp(self.timestamp_ns / 1e9).isoformat()
+
+
+class RateLimiter:
+    """Space out calls at a fixed rate across threads"""
+    
+    def __init__(self, requests_per_second):
+        """Initialize with the allowed number of calls per second"""
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self):
+        """Claim the next call slot and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+    
+    def wait(self):
+        """Block until the next call is allowed"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def async_wait(self):
+        """Wait without blocking the event loop until the next call is allowed"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 class AIAccuracyAuditor:
@@ -73,16 +277,27 @@ class AIAccuracyAuditor:
             with open(config_path, 'r') as f:
                 self.config.update(json.load(f))
         
+        # Resolve configured paths relative to this script once
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.report_dir = os.path.abspath(os.path.join(base_dir, self.config['report_path']))
+        self.test_sets_dir = os.path.abspath(os.path.join(base_dir, self.config['test_sets_path']))
+        self.db_path = os.path.abspath(os.path.join(base_dir, self.config['db_path']))
+        
         # Create report directory if it doesn't exist
-        os.makedirs(os.path.abspath(os.path.join(
-            os.path.dirname(__file__), self.config['report_path'])), 
-            exist_ok=True
-        )
+        os.makedirs(self.report_dir, exist_ok=True)
         
         # Initialize DB connection for ground truth data
-        db_path = os.path.abspath(os.path.join(
-            os.path.dirname(__file__), self.config['db_path']))
-        self.conn = self._connect_db(db_path)
+        self.conn = self._connect_db(self.db_path)
+        
+        # Shared session so queries reuse keep-alive connections; the pool
+        # holds one connection per concurrent query
+        self.session = self._create_session()
+        
+        # Paces queries sent concurrently by run_test_set
+        self.rate_limiter = RateLimiter(self.config["max_requests_per_second"])
+        
+        # Cleared once the AI system turns out not to have a batch endpoint
+        self._batch_supported = True
         
         # Test statistics
         self.test_stats = {
@@ -93,10 +308,42 @@ class AIAccuracyAuditor:
             "average_citation_score": 0.0
         }
         
+    def __enter__(self):
+        """Use the auditor as a context manager that closes its resources on exit"""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the auditor's resources"""
+        self.close()
+    
+    def close(self):
+        """Close the HTTP session and database connection"""
+        self.session.close()
+        self.conn.close()
+    
+    def _create_session(self):
+        """Create an HTTP session with a connection pool sized for concurrent queries"""
+        pool_size = max(1, self.config["max_concurrency"])
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=5, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=None)
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
     def _connect_db(self, db_path):
         """Connect to SQLite database"""
         try:
             conn = sqlite3.connect(db_path)
+            # WAL with NORMAL sync makes each commit cheap and lets readers
+            # keep working while results are written
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.row_factory = sqlite3.Row
             # Create audit results table if it doesn't exist
             cursor = conn.cursor()
             cursor.execute('''
@@ -119,18 +366,10 @@ class AIAccuracyAuditor:
     
     def load_test_set(self, test_set_name):
         """Load a specific test set from JSON file"""
-        test_set_path = os.path.abspath(os.path.join(
-            os.path.dirname(__file__), 
-            self.config['test_sets_path'], 
-            f"{test_set_name}.json"
-        ))
+        test_set_path = os.path.join(self.test_sets_dir, f"{test_set_name}.json")
         
         if not os.path.exists(test_set_path):
-            test_set_path = os.path.abspath(os.path.join(
-                os.path.dirname(__file__), 
-                self.config['test_sets_path'], 
-                "default.json"
-            ))
+            test_set_path = os.path.join(self.test_sets_dir, "default.json")
             logger.warning(f"Test set {test_set_name} not found, using default")
             
             # Create default test set if it doesn't exist
@@ -161,101 +400,162 @@ class AIAccuracyAuditor:
                     }, f, indent=2)
         
         try:
-            with open(test_set_path, 'r') as f:
-                test_set = json.load(f)
-                logger.info(f"Loaded test set {test_set['name']} with {len(test_set['tests'])} tests")
-                return test_set
-        except (json.JSONDecodeError, FileNotFoundError) as e:
+            test_set = _load_test_set_file(test_set_path, os.stat(test_set_path).st_mtime_ns)
+            logger.info(f"Loaded test set {test_set['name']} with {len(test_set['tests'])} tests")
+            # The parsed set is shared through the cache, so hand out a copy
+            return {**test_set, "tests": list(test_set["tests"])}
+        except (orjson.JSONDecodeError, FileNotFoundError) as e:
             logger.error(f"Error loading test set: {e}")
             return {"name": "error", "tests": []}
     
     def query_ai_system(self, query):
-        """Send a query to the AI system and get the response"""
+        """Send a query to the AI system and get an (ok, response or error message) pair"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.config["api_endpoint"],
                 json={"query": query},
                 timeout=30
             )
             response.raise_for_status()
-            return response.json()["response"]
+            return True, response.json()["response"]
         except (requests.RequestException, KeyError, json.JSONDecodeError) as e:
             logger.error(f"Error querying AI system: {e}")
-            return f"ERROR: Failed to get response from AI system: {str(e)}"
+            return False, f"ERROR: Failed to get response from AI system: {str(e)}"
     
-    def evaluate_accuracy(self, response, expected_content):
-        """Evaluate the accuracy of the AI response against expected content"""
-        if not response or "ERROR:" in response:
-            return 0.0, ["Failed to get valid response from AI"]
-        
-        # Count how many expected content items are present in the response
-        found_items = 0
-        errors = []
-        
-        for item in expected_content:
-            if item.lower() in response.lower():
-                found_items += 1
-            else:
-                errors.append(f"Missing expected content: {item}")
+    def query_ai_system_batch(self, queries):
+        """Send a batch of queries in one request, falling back to single queries if batching is unsupported
+        
+        Returns an (ok, response or error message) pair per query, in order.
+        """
+        if self._batch_supported and len(queries) > 1:
+            self.rate_limiter.wait()
+            try:
+                response = self.session.post(
+                    self.config["batch_api_endpoint"],
+                    json={"queries": queries},
+                    # The server answers every query before responding
+                    timeout=30 * len(queries)
+                )
+                responses = self._read_batch_response(response, queries)
+                if responses is not None:
+                    return responses
+            except (requests.RequestException, KeyError, TypeError, json.JSONDecodeError) as e:
+                logger.error(f"Error querying AI system: {e}")
+                return [(False, f"ERROR: Failed to get response from AI system: {str(e)}")] * len(queries)
+        
+        return [self._rate_limited_query(query) for query in queries]
+    
+    def _read_batch_response(self, response, queries):
+        """Get the (ok, text) pairs from a batch response, or None to fall back to single queries
+        
+        Works with both requests and httpx responses; errors are raised for the caller to handle.
+        """
+        if response.status_code in (404, 405):
+            logger.info("AI system has no batch query endpoint, sending queries individually")
+            self._batch_supported = False
+            return None
+        
+        response.raise_for_status()
+        responses = response.json()["responses"]
+        if len(responses) == len(queries):
+            return [(True, text) for text in responses]
+        logger.error(f"Batch query returned {len(responses)} responses for {len(queries)} queries")
+        return None
+    
+    async def _aquery(self, client, query):
+        """Send a single query on the async client, returning an (ok, text) pair"""
+        await self.rate_limiter.async_wait()
+        try:
+            response = await client.post(self.config["api_endpoint"], json={"query": query})
+            response.raise_for_status()
+            return True, response.json()["response"]
+        except (httpx.HTTPError, KeyError, json.JSONDecodeError) as e:
+            logger.error(f"Error querying AI system: {e}")
+            return False, f"ERROR: Failed to get response from AI system: {str(e)}"
+    
+    async def _aquery_batch(self, client, queries):
+        """Async counterpart of query_ai_system_batch"""
+        if self._batch_supported and len(queries) > 1:
+            await self.rate_limiter.async_wait()
+            try:
+                response = await client.post(
+                    self.config["batch_api_endpoint"],
+                    json={"queries": queries},
+                    timeout=30 * len(queries)
+                )
+                responses = self._read_batch_response(response, queries)
+                if responses is not None:
+                    return responses
+            except (httpx.HTTPError, KeyError, TypeError, json.JSONDecodeError) as e:
+                logger.error(f"Error querying AI system: {e}")
+                return [(False, f"ERROR: Failed to get response from AI system: {str(e)}")] * len(queries)
+        
+        return list(await asyncio.gather(*(self._aquery(client, query) for query in queries)))
+    
+    async def _aquery_batches(self, batches):
+        """Query every batch of tests concurrently on one async client, returning responses in order"""
+        max_connections = max(1, self.config["max_concurrency"])
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # Requests queue for a free connection without timing out
+        timeout = httpx.Timeout(30.0, pool=None)
+        async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+            return await asyncio.gather(*(self._aquery_tests(client, batch) for batch in batches))
+    
+    async def _aquery_tests(self, client, tests):
+        """Async counterpart of _query_tests"""
+        for test in tests:
+            logger.info("Running test %s: %s", test['id'], test['query'])
+        return await self._aquery_batch(client, [test["query"] for test in tests])
+    
+    def _rate_limited_query(self, query):
+        """Send a single query once the rate limiter allows it"""
+        self.rate_limiter.wait()
+        return self.query_ai_system(query)
+    
+    def evaluate_accuracy(self, response, expected_content, response_lower=None, expected_lower=None):
+        """Evaluate the accuracy of the AI response against expected content
         
-        if not expected_content:
-            return 1.0, []  # No expected content specified
-            
-        accuracy = found_items / len(expected_content)
-        return accuracy, errors
-    
-    def evaluate_citations(self, response, expected_citations):
-        """Evaluate the citation accuracy in the AI response"""
-        if not response or "ERROR:" in response:
-            return 0.0, ["Failed to get valid response from AI"]
-        
-        # Count how many expected citations are present in the response
-        found_citations = 0
-        errors = []
-        
-        for citation in expected_citations:
-            # Look for citation patterns
-            citation_pattern = re.compile(
-                rf'(?:cited|according to|based on|from|in)\s+.*{re.escape(citation)}', 
-                re.IGNORECASE
-            )
-            
-            # Also check for <cite> tags if using a citation format
-            cite_tag_pattern = re.compile(
-                rf'<cite[^>]*>.*{re.escape(citation)}.*</cite>', 
-                re.IGNORECASE
-            )
-            
-            if (citation.lower() in response.lower() or 
-                citation_pattern.search(response) or 
-                cite_tag_pattern.search(response)):
-                found_citations += 1
-            else:
-                errors.append(f"Missing expected citation: {citation}")
+        response_lower and expected_lower may be passed when the caller already
+        lowercased the response or the expected content.
+        """
+        return _evaluate_accuracy(response, expected_content, response_lower, expected_lower)
+    
+    def evaluate_citations(self, response, expected_citations, response_lower=None, citations_lower=None):
+        """Evaluate the citation accuracy in the AI response
         
-        if not expected_citations:
-            return 1.0, []  # No expected citations specified
-            
-        citation_score = found_citations / len(expected_citations)
-        return citation_score, errors
+        response_lower and citations_lower may be passed when the caller already
+        lowercased the response or the expected citations.
+        """
+        return _evaluate_citations(response, expected_citations, response_lower, citations_lower)
     
     def run_test(self, test):
         """Run a single test and evaluate the result"""
-        query = test["query"]
-        logger.info(f"Running test {test['id']}: {query}")
-        
-        # Get AI response
-        ai_response = self.query_ai_system(query)
-        
-        # Evaluate accuracy
-        accuracy_score, accuracy_errors = self.evaluate_accuracy(
-            ai_response, test.get("expected_content", [])
-        )
+        ok, ai_response = self._query_test(test)
+        result = self._evaluate_test(test, ok, ai_response)
         
-        # Evaluate citations
-        citation_score, citation_errors = self.evaluate_citations(
-            ai_response, test.get("expected_citations", [])
-        )
+        # Save to database
+        self._save_results([result])
+        return result
+    
+    def _query_test(self, test):
+        """Get the AI response for a test, respecting the configured rate cap"""
+        logger.info("Running test %s: %s", test['id'], test['query'])
+        return self._rate_limited_query(test["query"])
+    
+    def _query_tests(self, tests):
+        """Get the AI responses for a batch of tests, in order"""
+        for test in tests:
+            logger.info("Running test %s: %s", test['id'], test['query'])
+        return self.query_ai_system_batch([test["query"] for test in tests])
+    
+    def _evaluate_test(self, test, ok, ai_response):
+        """Evaluate an AI response for a test and record it in the statistics"""
+        return self._record_result(test, ai_response, _score_response(test, ok, ai_response))
+    
+    def _record_result(self, test, ai_response, scores):
+        """Build the result for a scored test and record it in the statistics"""
+        query = test["query"]
+        accuracy_score, accuracy_errors, citation_score, citation_errors = scores
         
         # Combine errors
         all_errors = accuracy_errors + citation_errors
@@ -272,56 +572,116 @@ class AIAccuracyAuditor:
             errors=all_errors
         )
         
-        # Save to database
-        self._save_result(result)
-        
         # Update statistics
+        threshold = self.config["threshold_score"]
+        passed = int(accuracy_score >= threshold and citation_score >= threshold)
         self.test_stats["total_tests"] += 1
-        if accuracy_score >= self.config["threshold_score"] and citation_score >= self.config["threshold_score"]:
-            self.test_stats["passed_tests"] += 1
-        else:
-            self.test_stats["failed_tests"] += 1
+        self.test_stats["passed_tests"] += passed
+        self.test_stats["failed_tests"] += 1 - passed
         
         # Log result
         log_level = logging.INFO if accuracy_score >= self.config["threshold_score"] else logging.WARNING
-        logger.log(log_level, f"Test {test['id']} - Accuracy: {accuracy_score:.2f}, Citations: {citation_score:.2f}")
-        if all_errors:
-            logger.warning(f"Errors in test {test['id']}: {', '.join(all_errors)}")
+        # Lazy %-style arguments, so suppressed per-test messages cost no formatting
+        logger.log(log_level, "Test %s - Accuracy: %.2f, Citations: %.2f", test['id'], accuracy_score, citation_score)
+        if all_errors and logger.isEnabledFor(logging.WARNING):
+            logger.warning("Errors in test %s: %s", test['id'], ', '.join(all_errors))
         
         return result
     
-    def _save_result(self, result):
-        """Save test result to database"""
+    def _save_results(self, results):
+        """Save test results to database in a single transaction"""
+        if not results:
+            return
+        
         cursor = self.conn.cursor()
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO ai_audit_results 
             (query_id, query, ai_response, accuracy_score, citation_score, errors, timestamp)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            result.query_id,
-            result.query,
-            result.ai_response,
-            result.accuracy_score,
-            result.citation_score,
-            json.dumps(result.errors),
-            result.timestamp
-        ))
+        ''', [
+            (
+                result.query_id,
+                result.query,
+                result.ai_response,
+                result.accuracy_score,
+                result.citation_score,
+                orjson.dumps(result.errors).decode(),
+                result.timestamp
+            )
+            for result in results
+        ])
         self.conn.commit()
     
+    def _query_batches(self, batches):
+        """Yield the responses for each batch of tests, in order
+        
+        Batches are sent concurrently from a thread pool, or from one event
+        loop for test sets too large to give every in-flight query a thread.
+        """
+        if sum(len(batch) for batch in batches) > self.config["async_query_threshold"]:
+            yield from asyncio.run(self._aquery_batches(batches))
+            return
+        
+        max_workers = max(1, self.config["max_concurrency"])
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from executor.map(self._query_tests, batches)
+    
+    def _score_in_processes(self, responses):
+        """Score (test, ok, response) triples across worker processes, returning (test, response, scores)"""
+        # Leave a couple of cores for the rest of the system
+        workers = max(1, (os.cpu_count() or 1) - 2)
+        tests = [test for test, _, _ in responses]
+        oks = [ok for _, ok, _ in responses]
+        texts = [ai_response for _, _, ai_response in responses]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scores = list(executor.map(_score_response, tests, oks, texts, chunksize=32))
+        return list(zip(tests, texts, scores))
+    
     def run_test_set(self, test_set):
         """Run all tests in a test set"""
         results = []
+        # Running score totals, so the averages need no second pass over results
+        accuracy_total = 0.0
+        citation_total = 0.0
+        
+        # Queries are grouped into batch requests, and the batches are sent
+        # concurrently by _query_batches since they are I/O-bound; the rate
+        # limiter keeps the API from being overloaded. Responses come back in
+        # test order and are recorded on this thread, so the statistics are
+        # only touched from one thread, and saved together at the end with a
+        # single commit.
+        tests = test_set["tests"]
+        batch_size = max(1, self.config["query_batch_size"])
+        batches = [tests[start:start + batch_size] for start in range(0, len(tests), batch_size)]
         
-        for test in test_set["tests"]:
-            result = self.run_test(test)
-            results.append(result)
-            # Small delay to avoid overloading the API
-            time.sleep(0.5)
+        try:
+            responses = (
+                (test, ok, ai_response)
+                for batch, batch_responses in zip(batches, self._query_batches(batches))
+                for test, (ok, ai_response) in zip(batch, batch_responses)
+            )
+            if len(tests) > self.config["parallel_evaluation_threshold"]:
+                scored = self._score_in_processes(list(responses))
+            else:
+                # Score each response as soon as it arrives
+                scored = (
+                    (test, ai_response, _score_response(test, ok, ai_response))
+                    for test, ok, ai_response in responses
+                )
+            
+            for test, ai_response, scores in scored:
+                result = self._record_result(test, ai_response, scores)
+                results.append(result)
+                accuracy_total += result.accuracy_score
+                citation_total += result.citation_score
+        finally:
+            # Keep whatever was evaluated even if the run is interrupted
+            self._save_results(results)
         
         # Update aggregate statistics
         if results:
-            self.test_stats["average_accuracy"] = sum(r.accuracy_score for r in results) / len(results)
-            self.test_stats["average_citation_score"] = sum(r.citation_score for r in results) / len(results)
+            self.test_stats["average_accuracy"] = accuracy_total / len(results)
+            self.test_stats["average_citation_score"] = citation_total / len(results)
         
         return results
     
@@ -358,15 +718,14 @@ class AIAccuracyAuditor:
         }
         
         # Save report to file
-        report_path = os.path.abspath(os.path.join(
-            os.path.dirname(__file__),
-            self.config["report_path"],
+        report_path = os.path.join(
+            self.report_dir,
             f"audit_report_{test_set_name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        ))
+        )
         
         os.makedirs(os.path.dirname(report_path), exist_ok=True)
-        with open(report_path, 'w') as f:
-            json.dump(report, f, indent=2)
+        with open(report_path, 'wb') as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
         
         logger.info(f"Audit report saved to {report_path}")
         
@@ -387,16 +746,57 @@ class AIAccuracyAuditor:
         # In a production system, this would integrate with email or notification systems
         # Example: send_email(recipients, subject, message)
     
+    def _sample_tax_laws(self, sample_size):
+        """Pick random tax law rows by rowid, without sorting the whole table"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT MAX(rowid) FROM tax_laws")
+        max_rowid = cursor.fetchone()[0] or 0
+        
+        laws = []
+        tried = set()
+        for _ in range(ROWID_SAMPLING_ROUNDS):
+            needed = min(sample_size - len(laws), max_rowid - len(tried))
+            if needed <= 0:
+                break
+            
+            # Deleted rows leave gaps, so some picks may not exist
+            rowids = []
+            while len(rowids) < needed:
+                rowid = random.randint(1, max_rowid)
+                if rowid not in tried:
+                    tried.add(rowid)
+                    rowids.append(rowid)
+            
+            for start in range(0, len(rowids), ROWID_FETCH_CHUNK):
+                chunk = rowids[start:start + ROWID_FETCH_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(f"SELECT rowid AS sample_rowid, id, title FROM tax_laws WHERE rowid IN ({placeholders})", chunk)
+                laws.extend(cursor.fetchall())
+        
+        # Top up from the rows not picked yet if the table is too sparse
+        if len(laws) < sample_size and len(tried) < max_rowid:
+            # The rowid is aliased, since an INTEGER PRIMARY KEY id column
+            # would otherwise take over its name in the result
+            picked = [law["sample_rowid"] for law in laws]
+            placeholders = ",".join("?" * len(picked))
+            cursor.execute(
+                f"SELECT rowid AS sample_rowid, id, title FROM tax_laws WHERE rowid NOT IN ({placeholders}) ORDER BY RANDOM() LIMIT ?",
+                picked + [sample_size - len(laws)]
+            )
+            laws.extend(cursor.fetchall())
+        
+        random.shuffle(laws)
+        return laws
+    
     def run_random_sampling(self, sample_size=10):
         """Run tests on random queries from the database"""
         # Get random tax law questions from our database
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id, title FROM tax_laws ORDER BY RANDOM() LIMIT ?", (sample_size,))
-        random_laws = cursor.fetchall()
+        random_laws = self._sample_tax_laws(sample_size)
         
         # Generate questions about these laws
         tests = []
-        for i, (law_id, title) in enumerate(random_laws):
+        for i, law in enumerate(random_laws):
+            title = law["title"]
             tests.append({
                 "id": f"random-{i+1:03d}",
                 "query": f"What are the key provisions of {title}?",
@@ -416,17 +816,16 @@ class AIAccuracyAuditor:
 
 def run_audit(args):
     """Main function to run the auditor with command line arguments"""
-    auditor = AIAccuracyAuditor(args.config)
-    
-    if args.random_sample:
-        # Run random sampling
-        results = auditor.run_random_sampling(args.sample_size)
-        auditor.generate_audit_report("random_sample", results)
-    else:
-        # Run specific test set
-        test_set = auditor.load_test_set(args.test_set)
-        results = auditor.run_test_set(test_set)
-        auditor.generate_audit_report(test_set["name"], results)
+    with AIAccuracyAuditor(args.config) as auditor:
+        if args.random_sample:
+            # Run random sampling
+            results = auditor.run_random_sampling(args.sample_size)
+            auditor.generate_audit_report("random_sample", results)
+        else:
+            # Run specific test set
+            test_set = auditor.load_test_set(args.test_set)
+            results = auditor.run_test_set(test_set)
+            auditor.generate_audit_report(test_set["name"], results)
 
 
 if __name__ == "__main__":
@@ -18,19 +18,28 @@ Usage:
 """
 
 import argparse
+import atexit
 import datetime
+import functools
+import hashlib
 import json
 import logging
 import os
+import queue
 import re
 import sqlite3
 import sys
+import threading
 import time
 import traceback
+import types
+from collections import Counter, OrderedDict
 from dataclasses import dataclass, asdict
 from enum import Enum
 from typing import Dict, List, Optional, Union, Any
 
+import orjson
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -46,15 +55,60 @@ logger = logging.getLogger("error_handler")
 DEFAULT_CONFIG = {
     "db_path": "../../../database/error_logs.db",
     "log_file": "system_errors.log",
-    "alert_threshold": {
+    # Read-only, so an accidental write raises instead of changing every handler
+    "alert_threshold": types.MappingProxyType({
         "critical": 1,      # Alert on first critical error
         "error": 5,         # Alert after 5 errors of same type in an hour
         "warning": 10       # Alert after 10 warnings of same type in an hour
-    },
+    }),
     "retention_days": 30,   # Keep error logs for 30 days
-    "alert_recipients": ["admin@example.com"]
+    "alert_recipients": ["admin@example.com"],
+    "queue_size": 10000,      # Errors waiting for the writer before new ones are dropped
+    "flush_batch_size": 500,  # Most errors the writer commits in one transaction
+    "flush_interval": 0.1,    # Seconds the writer waits to fill a batch
+    "trend_cache_ttl": 60,    # Seconds a get_error_trends result is reused
+    "log_buffer_size": 1 << 20,  # Bytes of JSON log lines buffered before writing
+    "alert_counter_limit": 4096,  # Error hashes tracked per severity for alerting
+    "cleanup_chunk_size": 1000,   # Rows deleted per transaction during cleanup
+    "min_persist_severity": "warning"  # Less severe records only go to the standard logger
 }
 
+# Variable parts of error messages (numbers and quoted values) ignored when grouping
+VARIABLE_PART_RE = re.compile(r"\d+|'[^']*'")
+
+# Filename recorded on this module's code objects, for skipping its own frames
+THIS_FILE = sys._getframe().f_code.co_filename
+
+
+def _mask_variable_part(match):
+    """Replace a quoted value with 'X' and a number with N"""
+    return "'X'" if match.group(0)[0] == "'" else 'N'
+
+
+@functools.lru_cache(maxsize=4096)
+def _hash_error(category, message, trace_line):
+    """Hash an error's category, normalized message and trace line to a 16-byte digest; repeats are cached"""
+    # Remove variable parts from message (dates, IDs, etc.) in one pass
+    clean_message = VARIABLE_PART_RE.sub(_mask_variable_part, message)
+    
+    hash_input = f"{category}:{clean_message}:{trace_line}"
+    return hashlib.blake2b(hash_input.encode(), digest_size=16).digest()
+
+
+def _encode_context(context, option=0):
+    """Encode an error context as JSON text, the same way for the log file, database and alerts"""
+    try:
+        # Values orjson has no encoding for are stored as their string form
+        return orjson.dumps(context, default=str, option=orjson.OPT_NON_STR_KEYS | option).decode()
+    except TypeError:
+        # Circular or out-of-range values; keep the record rather than lose it
+        return orjson.dumps({"repr": repr(context)}, option=option).decode()
+
+
+def _hash_hex(error_hash):
+    """Render a stored error hash as hex; rows from before BLOB hashes already hold hex text"""
+    return error_hash.hex() if isinstance(error_hash, bytes) else error_hash
+
 
 class ErrorSeverity(Enum):
     """Enum for error severity levels"""
@@ -64,6 +118,10 @@ class ErrorSeverity(Enum):
     INFO = "info"           # Informational message, no action needed
 
 
+# Severity values from most to least severe
+SEVERITY_ORDER = [severity.value for severity in ErrorSeverity]
+
+
 class ErrorCategory(Enum):
     """Enum for error categories"""
     RETRIEVAL = "retrieval"      # Data retrieval errors (HTTP, API, etc.)
@@ -86,7 +144,7 @@ class ErrorRecord:
     source: str
     context: Dict[str, Any]
     stack_trace: str
-    error_hash: str = ""  # Unique hash for grouping similar errors
+    error_hash: bytes = b""  # Unique hash for grouping similar errors
 
 
 class ErrorHandler:
@@ -94,27 +152,52 @@ class ErrorHandler:
     
     def __init__(self, config_path=None):
         """Initialize the error handler with configuration"""
-        self.config = DEFAULT_CONFIG
+        # Copy the defaults so a config file only affects this handler
+        self.config = {**DEFAULT_CONFIG, "alert_threshold": dict(DEFAULT_CONFIG["alert_threshold"])}
         if config_path and os.path.exists(config_path):
             with open(config_path, 'r') as f:
                 self.config.update(json.load(f))
         
+        # Severities stored and alerted on; the rest are advisory
+        min_rank = SEVERITY_ORDER.index(self.config["min_persist_severity"])
+        self._persisted_severities = frozenset(SEVERITY_ORDER[:min_rank + 1])
+        
         # Initialize DB connection
         db_path = os.path.abspath(os.path.join(
             os.path.dirname(__file__), self.config["db_path"]))
         self.conn = self._connect_db(db_path)
         
-        # Error counters for tracking thresholds
+        # Error records waiting for the background writer; when it falls this far
+        # behind, new errors are dropped rather than blocking the caller
+        self._queue = queue.Queue(maxsize=self.config["queue_size"])
+        self._dropped = 0
+        # Serializes use of the connection between callers and the writer
+        self._db_lock = threading.Lock()
+        
+        # Trend query SQL by number of categories, and recent results by query
+        self._trend_sql_cache = {}
+        self._trend_result_cache = {}
+        
+        # Error counters for tracking thresholds, least recently seen hash first
+        # so the oldest can be dropped once a severity tracks too many
         self.error_counts = {
-            ErrorSeverity.CRITICAL.value: {},
-            ErrorSeverity.ERROR.value: {},
-            ErrorSeverity.WARNING.value: {}
+            ErrorSeverity.CRITICAL.value: OrderedDict(),
+            ErrorSeverity.ERROR.value: OrderedDict(),
+            ErrorSeverity.WARNING.value: OrderedDict()
         }
         
         # Ensure log directory exists
         log_dir = os.path.dirname(os.path.abspath(self.config["log_file"]))
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
+        
+        # Keep the log file open; the writer flushes it after each batch
+        self._log_file = open(self.config["log_file"], "ab", buffering=self.config["log_buffer_size"])
+        
+        # Database and file writes happen on a single background thread
+        self._writer = threading.Thread(target=self._drain_loop, name="error-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
     
     def _connect_db(self, db_path):
         """Connect to SQLite database and initialize tables"""
@@ -122,9 +205,23 @@ class ErrorHandler:
             # Ensure the directory exists
             os.makedirs(os.path.dirname(db_path), exist_ok=True)
             
-            conn = sqlite3.connect(db_path)
+            # The writer thread uses the connection too, guarded by _db_lock
+            conn = sqlite3.connect(db_path, check_same_thread=False)
             cursor = conn.cursor()
             
+            # WAL lets report queries read while errors are written. With
+            # synchronous=NORMAL a commit skips its fsync, so a power loss can
+            # drop the last few milliseconds of commits but never corrupts the log
+            for pragma in (
+                "journal_mode=WAL",
+                "synchronous=NORMAL",
+                "temp_store=MEMORY",
+                "mmap_size=268435456",
+                "cache_size=-20000",
+                "wal_autocheckpoint=1000"
+            ):
+                cursor.execute(f"PRAGMA {pragma}")
+            
             # Create error_logs table if it doesn't exist
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS error_logs (
@@ -136,7 +233,7 @@ class ErrorHandler:
                     source TEXT,
                     context TEXT,
                     stack_trace TEXT,
-                    error_hash TEXT
+                    error_hash BLOB
                 )
             ''')
             
@@ -147,11 +244,58 @@ class ErrorHandler:
                     date TEXT,
                     severity TEXT,
                     category TEXT,
-                    error_hash TEXT,
+                    error_hash BLOB,
                     count INTEGER
                 )
             ''')
             
+            # Similar-error and retrieval-error lookups filter on a column and take
+            # the newest rows, so the index scan can stop at the LIMIT; cleanup
+            # deletes by timestamp alone
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_error_logs_hash ON error_logs (error_hash, timestamp)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_error_logs_category ON error_logs (category, timestamp)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_error_logs_timestamp ON error_logs (timestamp)"
+            )
+            
+            # Trend counts are upserted, which needs a unique key. Older databases
+            # may hold duplicate trend rows, so fold them into one row per key
+            # first; every logged error added one row, so the row count is the count
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_error_trends_key'"
+            )
+            if not cursor.fetchone():
+                cursor.execute('''
+                    UPDATE error_trends SET count = (
+                        SELECT COUNT(*) FROM error_trends AS t
+                        WHERE t.date IS error_trends.date AND t.severity IS error_trends.severity
+                        AND t.category IS error_trends.category AND t.error_hash IS error_trends.error_hash
+                    )
+                    WHERE id IN (
+                        SELECT MIN(id) FROM error_trends
+                        GROUP BY date, severity, category, error_hash HAVING COUNT(*) > 1
+                    )
+                ''')
+                cursor.execute('''
+                    DELETE FROM error_trends WHERE id NOT IN (
+                        SELECT MIN(id) FROM error_trends GROUP BY date, severity, category, error_hash
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE UNIQUE INDEX idx_error_trends_key
+                    ON error_trends (date, severity, category, error_hash)
+                ''')
+            
+            # Gather planner statistics once, so the indexes above are chosen;
+            # cleanup_old_errors refreshes them afterwards
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if not cursor.fetchone():
+                cursor.execute("ANALYZE")
+            
             conn.commit()
             return conn
         except sqlite3.Error as e:
@@ -161,32 +305,39 @@ class ErrorHandler:
     
     def _generate_error_hash(self, message, category, stack_trace=None):
         """Generate a unique hash for an error to group similar ones"""
-        # Remove variable parts from message (dates, IDs, etc.)
-        clean_message = re.sub(r'\d+', 'N', message)
-        clean_message = re.sub(r'\'[^\']*\'', "'X'", clean_message)
-        
         # Get the first line of stack trace if available (most relevant part)
         trace_line = ""
         if stack_trace:
-            trace_lines = stack_trace.split('\n')
+            # Only the tail is needed, so split off at most the last two lines
+            trace_lines = stack_trace.rsplit('\n', 2)
             if len(trace_lines) > 1:
                 trace_line = trace_lines[-2]  # Usually the most specific line
         
-        # Combine and hash
-        import hashlib
-        hash_input = f"{category}:{clean_message}:{trace_line}"
-        return hashlib.md5(hash_input.encode()).hexdigest()
+        return _hash_error(category, message, trace_line)
     
     def log_error(self, message, category, severity=ErrorSeverity.ERROR, context=None, source=None):
-        """Log an error with context and optionally send alerts"""
+        """Log an error with context and optionally send alerts
+        
+        Records less severe than min_persist_severity (INFO by default) are
+        advisory: they go to the standard logger only, are not kept in the
+        error database or log file, and None is returned.
+        """
         if isinstance(severity, str):
             severity = next((sev for sev in ErrorSeverity if sev.value == severity), ErrorSeverity.ERROR)
         
         if isinstance(category, str):
             category = next((cat for cat in ErrorCategory if cat.value == category), ErrorCategory.OTHER)
         
-        # Get current stack trace
-        stack_trace = traceback.format_exc() if sys.exc_info()[0] else ""
+        # Skip hashing, storage and alerting for advisory records
+        if severity.value not in self._persisted_severities:
+            logger.info(f"[{category.value}] {message}")
+            return None
+        
+        # Get current stack trace; only critical errors and errors carry one,
+        # so warnings and info skip formatting it
+        stack_trace = ""
+        if severity in (ErrorSeverity.CRITICAL, ErrorSeverity.ERROR) and sys.exc_info()[0] is not None:
+            stack_trace = traceback.format_exc()
         
         # Generate error hash
         error_hash = self._generate_error_hash(message, category.value, stack_trace)
@@ -203,57 +354,133 @@ class ErrorHandler:
             error_hash=error_hash
         )
         
-        # Log to database
-        self._log_to_db(error_record)
-        
-        # Log to file
-        self._log_to_file(error_record)
+        # Hand off to the writer for the database and file
+        self._enqueue(error_record)
         
         # Check if we need to send an alert
         self._check_alert_threshold(error_record)
         
         return error_record
     
-    def _log_to_db(self, error_record):
-        """Store error record in database"""
-        if not self.conn:
-            return
-        
+    def _enqueue(self, error_record):
+        """Queue an error record for the writer, dropping it if the queue is full"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT INTO error_logs (timestamp, severity, category, message, source, context, stack_trace, error_hash) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            self._queue.put_nowait(error_record)
+        except queue.Full:
+            # Shed load like syslog rather than stall the code reporting the error
+            self._dropped += 1
+            if self._dropped % 1000 == 1:
+                logger.warning(f"Error log queue full, {self._dropped} error(s) dropped so far")
+    
+    def _drain_loop(self):
+        """Write queued error records in batches until close() queues the stop sentinel"""
+        while True:
+            record = self._queue.get()
+            if record is None:
+                self._queue.task_done()
+                return
+            
+            # Collect more records briefly, so a burst shares one transaction
+            batch = [record]
+            stopping = False
+            deadline = time.monotonic() + self.config["flush_interval"]
+            while len(batch) < self.config["flush_batch_size"]:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} error records: {e}")
+            finally:
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+            
+            if stopping:
+                return
+    
+    def _write_batch(self, records):
+        """Write a batch of error records to the log file and database"""
+        for record in records:
+            self._log_to_file(record)
+        try:
+            self._log_file.flush()
+        except OSError as e:
+            logger.error(f"Failed to flush error log file: {e}")
+        
+        self._log_to_db(records)
+    
+    def _log_to_db(self, records):
+        """Store error records in the database in a single transaction"""
+        with self._db_lock:
+            if not self.conn:
+                return
+            
+            rows = [
                 (
-                    error_record.timestamp,
-                    error_record.severity,
-                    error_record.category,
-                    error_record.message,
-                    error_record.source,
-                    json.dumps(error_record.context),
-                    error_record.stack_trace,
-                    error_record.error_hash
+                    record.timestamp,
+                    record.severity,
+                    record.category,
+                    record.message,
+                    record.source,
+                    _encode_context(record.context),
+                    record.stack_trace,
+                    record.error_hash
                 )
-            )
+                for record in records
+            ]
             
-            # Update trends table
-            date = error_record.timestamp.split("T")[0]  # Get just the date part
-            cursor.execute(
-                "INSERT OR IGNORE INTO error_trends (date, severity, category, error_hash, count) "
-                "VALUES (?, ?, ?, ?, 0)",
-                (date, error_record.severity, error_record.category, error_record.error_hash)
+            # One upsert per trend key rather than per error
+            trend_counts = Counter(
+                (record.timestamp.split("T")[0], record.severity, record.category, record.error_hash)
+                for record in records
             )
-            cursor.execute(
-                "UPDATE error_trends SET count = count + 1 "
-                "WHERE date = ? AND severity = ? AND category = ? AND error_hash = ?",
-                (date, error_record.severity, error_record.category, error_record.error_hash)
-            )
-            
-            self.conn.commit()
+            trend_rows = [(*key, count) for key, count in trend_counts.items()]
             
-        except sqlite3.Error as e:
-            # Log to standard logger if DB insert fails
-            logger.error(f"Failed to log error to database: {e}")
+            try:
+                # One transaction per batch, so a burst of errors costs one commit
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT INTO error_logs (timestamp, severity, category, message, source, context, stack_trace, error_hash) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO error_trends (date, severity, category, error_hash, count) "
+                        "VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (date, severity, category, error_hash) DO UPDATE SET count = count + excluded.count",
+                        trend_rows
+                    )
+            except sqlite3.Error as e:
+                # Log to standard logger if DB insert fails
+                logger.error(f"Failed to log {len(records)} errors to database: {e}")
+    
+    def flush(self):
+        """Block until every queued error record has been written"""
+        if self._writer.is_alive():
+            self._queue.join()
+    
+    def close(self):
+        """Write queued errors, then stop the writer and close the log file and database connection"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        
+        self._log_file.close()
+        
+        with self._db_lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
     
     def _log_to_file(self, error_record):
         """Log error to file in a structured format"""
@@ -265,16 +492,21 @@ class ErrorHandler:
                 "message": error_record.message,
                 "source": error_record.source,
                 "context": error_record.context,
-                "error_hash": error_record.error_hash
+                "error_hash": error_record.error_hash.hex()
             }
             
             # Add stack trace only if it exists
             if error_record.stack_trace:
                 log_entry["stack_trace"] = error_record.stack_trace
             
-            # Log to file
-            with open(self.config["log_file"], "a") as f:
-                f.write(json.dumps(log_entry) + "\n")
+            # Log to file; a context orjson cannot encode is logged by its repr
+            options = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            try:
+                line = orjson.dumps(log_entry, default=str, option=options)
+            except TypeError:
+                log_entry["context"] = {"repr": repr(error_record.context)}
+                line = orjson.dumps(log_entry, default=str, option=options)
+            self._log_file.write(line)
         except Exception as e:
             # Last resort: log to standard logger
             logger.error(f"Failed to log error to file: {e}")
@@ -282,32 +514,38 @@ class ErrorHandler:
     
     def _get_caller_info(self):
         """Get information about the calling function/module"""
-        stack = traceback.extract_stack()
-        # Look for the first frame that isn't in this file
-        for frame in reversed(stack[:-1]):  # Skip this function
-            filename = os.path.basename(frame.filename)
-            if filename != os.path.basename(__file__):
-                return f"{filename}:{frame.lineno} in {frame.name}"
-        return "unknown"
+        # Walk up from our caller to the first frame that isn't in this file,
+        # without building a summary of the whole stack
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename == THIS_FILE:
+            frame = frame.f_back
+        if frame is None:
+            return "unknown"
+        return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
     
     def _check_alert_threshold(self, error_record):
         """Check if we should send an alert based on error frequency"""
         severity = error_record.severity
         error_hash = error_record.error_hash
         
-        # Initialize counter if needed
-        if error_hash not in self.error_counts[severity]:
-            self.error_counts[severity][error_hash] = {
+        # Initialize counter if needed, evicting the least recently seen hash
+        counters = self.error_counts[severity]
+        counter = counters.get(error_hash)
+        if counter is None:
+            counter = counters[error_hash] = {
                 "count": 0,
                 "first_seen": datetime.datetime.now(),
                 "last_alerted": None
             }
+            if len(counters) > self.config["alert_counter_limit"]:
+                counters.popitem(last=False)
+        else:
+            counters.move_to_end(error_hash)
         
         # Update counter
-        self.error_counts[severity][error_hash]["count"] += 1
+        counter["count"] += 1
         
         # Check if we need to send an alert
-        counter = self.error_counts[severity][error_hash]
         threshold = self.config["alert_threshold"][severity]
         
         # Calculate time since first error
@@ -345,7 +583,7 @@ Count: {count} occurrence(s) in the last hour
         """
         
         if error_record.context:
-            message += f"\nContext: {json.dumps(error_record.context, indent=2)}"
+            message += f"\nContext: {_encode_context(error_record.context, orjson.OPT_INDENT_2)}"
         
         if error_record.stack_trace:
             message += f"\nStack Trace:\n{error_record.stack_trace}"
@@ -368,16 +606,19 @@ Count: {count} occurrence(s) in the last hour
         if not self.conn:
             return []
         
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT timestamp, message FROM error_logs "
-                "WHERE error_hash = ? ORDER BY timestamp DESC LIMIT ?",
-                (error_hash, limit)
-            )
-            return [{"timestamp": row[0], "message": row[1]} for row in cursor.fetchall()]
-        except sqlite3.Error:
-            return []
+        # Include errors still waiting in the buffer
+        self.flush()
+        with self._db_lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT timestamp, message FROM error_logs "
+                    "WHERE error_hash = ? ORDER BY timestamp DESC LIMIT ?",
+                    (error_hash, limit)
+                )
+                return [{"timestamp": row[0], "message": row[1]} for row in cursor.fetchall()]
+            except sqlite3.Error:
+                return []
     
     def cleanup_old_errors(self):
         """Remove error logs older than retention period"""
@@ -387,99 +628,142 @@ Count: {count} occurrence(s) in the last hour
         retention_days = self.config["retention_days"]
         cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=retention_days)).isoformat()
         
+        self.flush()
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM error_logs WHERE timestamp < ?", (cutoff_date,))
-            deleted_count = cursor.rowcount
+            deleted_count = self._delete_older_than("error_logs", "timestamp", cutoff_date)
             
             # Also cleanup trends table for dates older than retention period
             cutoff_date_short = cutoff_date.split("T")[0]  # Just the date part
-            cursor.execute("DELETE FROM error_trends WHERE date < ?", (cutoff_date_short,))
+            self._delete_older_than("error_trends", "date", cutoff_date_short)
+            
+            with self._db_lock:
+                cursor = self.conn.cursor()
+                # Refresh planner statistics after the bulk delete
+                cursor.execute("ANALYZE")
+                # Shrink the WAL file back down now the deletes are checkpointed
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
             
-            self.conn.commit()
+            self._trend_result_cache.clear()
             logger.info(f"Cleaned up {deleted_count} error logs older than {retention_days} days")
             return deleted_count
         except sqlite3.Error as e:
             logger.error(f"Failed to clean up old error logs: {e}")
             return 0
     
+    def _delete_older_than(self, table, column, cutoff):
+        """Delete rows with column before cutoff in small transactions, returning the number deleted"""
+        chunk_size = self.config["cleanup_chunk_size"]
+        deleted = 0
+        while True:
+            # Release the connection between chunks so the writer can commit new errors
+            with self._db_lock, self.conn:
+                cursor = self.conn.execute(
+                    f"DELETE FROM {table} WHERE id IN "
+                    f"(SELECT id FROM {table} WHERE {column} < ? LIMIT ?)",
+                    (cutoff, chunk_size)
+                )
+            deleted += cursor.rowcount
+            if cursor.rowcount < chunk_size:
+                return deleted
+    
     def get_error_trends(self, days=7, categories=None):
         """Get error trends for the last N days"""
         if not self.conn:
             return {}
         
         start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d")
-        
-        category_filter = ""
-        params = [start_date]
-        
-        if categories:
-            placeholders = ", ".join(["?"] * len(categories))
-            category_filter = f"AND category IN ({placeholders})"
-            params.extend(categories)
-        
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
+        categories = tuple(sorted(categories or ()))
+        
+        # Dashboards repeat the same query, so reuse a recent result
+        cache_key = (start_date, categories)
+        cached = self._trend_result_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.config["trend_cache_ttl"]:
+            return cached[1]
+        
+        params = [start_date, *categories]
+        
+        # Build the SQL once per number of categories; sqlite3 keeps the
+        # prepared statement for each distinct query string
+        query = self._trend_sql_cache.get(len(categories))
+        if query is None:
+            category_filter = ""
+            if categories:
+                placeholders = ", ".join(["?"] * len(categories))
+                category_filter = f"AND category IN ({placeholders})"
+            query = (
                 f"SELECT date, severity, category, SUM(count) FROM error_trends "
                 f"WHERE date >= ? {category_filter} "
                 f"GROUP BY date, severity, category "
-                f"ORDER BY date",
-                params
+                f"ORDER BY date"
             )
-            
-            results = cursor.fetchall()
-            
-            # Organize data by date, then severity, then category
-            trends = {}
-            for row in results:
-                date, severity, category, count = row
+            self._trend_sql_cache[len(categories)] = query
+        
+        self.flush()
+        with self._db_lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(query, params)
                 
-                if date not in trends:
-                    trends[date] = {}
+                results = cursor.fetchall()
                 
-                if severity not in trends[date]:
-                    trends[date][severity] = {}
+                # Organize data by date, then severity, then category
+                trends = {}
+                for row in results:
+                    date, severity, category, count = row
+                    
+                    if date not in trends:
+                        trends[date] = {}
+                    
+                    if severity not in trends[date]:
+                        trends[date][severity] = {}
+                    
+                    trends[date][severity][category] = count
                 
-                trends[date][severity][category] = count
-            
-            return trends
-        except sqlite3.Error as e:
-            logger.error(f"Failed to get error trends: {e}")
-            return {}
+                self._trend_result_cache[cache_key] = (time.monotonic(), trends)
+                return trends
+            except sqlite3.Error as e:
+                logger.error(f"Failed to get error trends: {e}")
+                return {}
     
     def get_most_frequent_errors(self, days=1, limit=10):
         """Get the most frequent errors in the last N days"""
         if not self.conn:
             return []
         
-        start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+        start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d")
         
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT error_hash, severity, category, message, COUNT(*) as count "
-                "FROM error_logs "
-                "WHERE timestamp >= ? "
-                "GROUP BY error_hash "
-                "ORDER BY count DESC "
-                "LIMIT ?",
-                (start_date, limit)
-            )
-            
-            return [
-                {
-                    "error_hash": row[0],
-                    "severity": row[1],
-                    "category": row[2],
-                    "message": row[3],
-                    "count": row[4]
-                }
-                for row in cursor.fetchall()
-            ]
-        except sqlite3.Error as e:
-            logger.error(f"Failed to get most frequent errors: {e}")
-            return []
+        self.flush()
+        with self._db_lock:
+            try:
+                # Count from the daily trend aggregate rather than scanning every
+                # logged error; only the latest message is fetched per hash
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT t.error_hash, t.severity, t.category, "
+                    "(SELECT l.message FROM error_logs l WHERE l.error_hash = t.error_hash "
+                    "ORDER BY l.timestamp DESC LIMIT 1) AS message, "
+                    "SUM(t.count) AS count "
+                    "FROM error_trends t "
+                    "WHERE t.date >= ? "
+                    "GROUP BY t.error_hash "
+                    "ORDER BY count DESC "
+                    "LIMIT ?",
+                    (start_date, limit)
+                )
+                
+                return [
+                    {
+                        "error_hash": _hash_hex(row[0]),
+                        "severity": row[1],
+                        "category": row[2],
+                        "message": row[3],
+                        "count": row[4]
+                    }
+                    for row in cursor.fetchall()
+                ]
+            except sqlite3.Error as e:
+                logger.error(f"Failed to get most frequent errors: {e}")
+                return []
     
     def get_retrieval_errors(self, days=1, limit=20):
         """Get recent retrieval errors specifically"""
@@ -488,29 +772,31 @@ Count: {count} occurrence(s) in the last hour
         
         start_date = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
         
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT timestamp, message, context, stack_trace "
-                "FROM error_logs "
-                "WHERE timestamp >= ? AND category = ? "
-                "ORDER BY timestamp DESC "
-                "LIMIT ?",
-                (start_date, ErrorCategory.RETRIEVAL.value, limit)
-            )
-            
-            return [
-                {
-                    "timestamp": row[0],
-                    "message": row[1],
-                    "context": json.loads(row[2]) if row[2] else {},
-                    "stack_trace": row[3] if row[3] else ""
-                }
-                for row in cursor.fetchall()
-            ]
-        except sqlite3.Error as e:
-            logger.error(f"Failed to get retrieval errors: {e}")
-            return []
+        self.flush()
+        with self._db_lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT timestamp, message, context, stack_trace "
+                    "FROM error_logs "
+                    "WHERE timestamp >= ? AND category = ? "
+                    "ORDER BY timestamp DESC "
+                    "LIMIT ?",
+                    (start_date, ErrorCategory.RETRIEVAL.value, limit)
+                )
+                
+                return [
+                    {
+                        "timestamp": row[0],
+                        "message": row[1],
+                        "context": json.loads(row[2]) if row[2] else {},
+                        "stack_trace": row[3] if row[3] else ""
+                    }
+                    for row in cursor.fetchall()
+                ]
+            except sqlite3.Error as e:
+                logger.error(f"Failed to get retrieval errors: {e}")
+                return []
 
 
 def run_cleanup(args):
@@ -8,9 +8,28 @@ It ensures the system is functioning properly and data is up-to-date.
 import requests
 import logging
 import json
+import atexit
+import threading
 from datetime import datetime, timedelta
 import os
 
+# Open health log files by path, shared by every HealthMonitor in the process;
+# the scheduler creates a new monitor for each run
+_health_log_files = {}
+_health_log_lock = threading.Lock()
+
+# Processed document counts by directory, as (mtime_ns, count), shared by every
+# HealthMonitor in the process for the same reason
+_coverage_cache = {}
+
+@atexit.register
+def _close_health_logs():
+    """Close the shared health log files"""
+    with _health_log_lock:
+        for f in _health_log_files.values():
+            f.close()
+        _health_log_files.clear()
+
 class HealthMonitor:
     """Monitor the health of the RAG system and indexes"""
     
@@ -98,14 +117,24 @@ class HealthMonitor:
             
             # Count documents in the processed directory
             processed_dir = 'data/processed'
-            if not os.path.exists(processed_dir):
+            try:
+                dir_mtime = os.stat(processed_dir).st_mtime_ns
+            except FileNotFoundError:
                 self.logger.warning("Processed directory not found")
                 self._log_health_status("document_coverage", False, "Processed directory not found")
                 return False
             
-            # Count processed documents
-            processed_files = [f for f in os.listdir(processed_dir) if f.endswith('.processed.txt')]
-            doc_count = len(processed_files)
+            # Count processed documents; adding or removing a file changes the
+            # directory's mtime, so an unchanged mtime means an unchanged count
+            cache_key = os.path.abspath(processed_dir)
+            cached_mtime, doc_count = _coverage_cache.get(cache_key, (None, 0))
+            if dir_mtime != cached_mtime:
+                with os.scandir(processed_dir) as it:
+                    doc_count = sum(
+                        1 for entry in it
+                        if entry.name.endswith('.processed.txt') and entry.is_file(follow_symlinks=False)
+                    )
+                _coverage_cache[cache_key] = (dir_mtime, doc_count)
             
             # Check against minimum threshold
             min_threshold = 5  # Minimum number of documents expected
@@ -149,7 +178,6 @@ class HealthMonitor:
     def _log_health_status(self, check_name, status, details=None):
         """Log health check status to file"""
         health_log_dir = os.path.join(self.stats_dir, 'health_logs')
-        os.makedirs(health_log_dir, exist_ok=True)
         
         log_entry = {
             "timestamp": datetime.now().isoformat(),
@@ -161,9 +189,15 @@ class HealthMonitor:
             log_entry["details"] = details
         
         log_file = os.path.join(health_log_dir, f"{check_name}_log.jsonl")
+        line = json.dumps(log_entry) + '\n'
         
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        # Reuse the open handle; line buffering still writes each entry out at once
+        with _health_log_lock:
+            f = _health_log_files.get(log_file)
+            if f is None:
+                os.makedirs(health_log_dir, exist_ok=True)
+                f = _health_log_files[log_file] = open(log_file, 'a', buffering=1, encoding='utf-8')
+            f.write(line)
 
 # Simple test to run if this module is run directly
 if __name__ == "__main__":
@@ -15,13 +15,15 @@ Usage:
 """
 
 import argparse
+import asyncio
 import datetime
-import json
+import functools
 import logging
 import os
-import requests
 import sqlite3
 import time
+import httpx
+import orjson
 from bs4 import BeautifulSoup
 from dateutil.parser import parse as parse_date
 
@@ -49,9 +51,26 @@ DEFAULT_CONFIG = {
     "check_frequency": 86400,  # 24 hours in seconds
     "outdated_threshold_days": 365,  # Consider laws older than 1 year for review
     "db_path": "../../../database/tax_laws.db",
-    "alert_recipients": ["admin@example.com"]
+    "alert_recipients": ["admin@example.com"],
+    "max_concurrent_fetches": 10  # Sources fetched at the same time
 }
 
+# Connection settings: WAL with synchronous=NORMAL commits without an fsync
+# per transaction, and a 64 MB cache keeps the law tables in memory
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+    "mmap_size=268435456"
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(date_text):
+    """Parse a date string, caching results since the same dates recur across items and cycles"""
+    return parse_date(date_text)
+
 
 class TaxDataMonitor:
     """Monitor tax law data sources for freshness and updates"""
@@ -60,8 +79,8 @@ class TaxDataMonitor:
         """Initialize the tax data monitor with configuration"""
         self.config = DEFAULT_CONFIG
         if config_path and os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                self.config.update(json.load(f))
+            with open(config_path, 'rb') as f:
+                self.config.update(orjson.loads(f.read()))
         
         # Initialize DB connection
         db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), self.config['db_path']))
@@ -74,16 +93,26 @@ class TaxDataMonitor:
         """Connect to SQLite database"""
         try:
             conn = sqlite3.connect(db_path)
-            # Create tables if they don't exist
             cursor = conn.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(f"PRAGMA {pragma}")
+            
+            # Create tables if they don't exist
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS data_source_tracking (
                     url TEXT PRIMARY KEY,
                     last_checked TIMESTAMP,
                     last_updated TIMESTAMP,
-                    status TEXT
+                    status TEXT,
+                    etag TEXT,
+                    last_modified TEXT
                 )
             ''')
+            # Databases created before conditional fetches lack the validator columns
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(data_source_tracking)")}
+            for column in ("etag", "last_modified"):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE data_source_tracking ADD COLUMN {column} TEXT")
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS outdated_laws (
                     law_id INTEGER,
@@ -94,45 +123,94 @@ class TaxDataMonitor:
                     status TEXT
                 )
             ''')
+            
+            # Index the law dates used to find outdated laws; tax_laws is
+            # managed by the data loader and may not exist yet
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index') AND name IN ('tax_laws', 'idx_tax_laws_publication_date')")
+            existing = {row[0] for row in cursor.fetchall()}
+            if "tax_laws" in existing and "idx_tax_laws_publication_date" not in existing:
+                cursor.execute("CREATE INDEX idx_tax_laws_publication_date ON tax_laws(publication_date)")
+                cursor.execute("ANALYZE tax_laws")
             conn.commit()
             return conn
         except sqlite3.Error as e:
             logger.error(f"Database error: {e}")
             raise
             
-    def fetch_source_data(self, source):
-        """Fetch data from a source URL"""
-        try:
-            logger.info(f"Checking source: {source['url']}")
-            response = requests.get(source['url'], timeout=30)
-            response.raise_for_status()
-            
-            # Update source tracking
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT OR REPLACE INTO data_source_tracking VALUES (?, ?, ?, ?)",
-                (source['url'], datetime.datetime.now(), None, "active")
-            )
-            self.conn.commit()
-            
-            return response.text
-        except requests.RequestException as e:
-            logger.error(f"Error fetching {source['url']}: {e}")
-            # Update source status
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "UPDATE data_source_tracking SET status = ? WHERE url = ?",
-                ("error", source['url'])
+    async def fetch_source_data(self, client, semaphore, source, validators=None):
+        """Fetch a source URL, returning the response or None if it could not be fetched
+        
+        If the ETag and Last-Modified values from the previous fetch are given, the
+        request is conditional and an unchanged page comes back as a bodiless 304.
+        """
+        headers = {}
+        if validators:
+            etag, last_modified = validators
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        
+        async with semaphore:
+            try:
+                logger.info(f"Checking source: {source['url']}")
+                response = await client.get(source['url'], headers=headers)
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+            except httpx.HTTPError as e:
+                logger.error(f"Error fetching {source['url']}: {e}")
+                return None
+    
+    def _load_validators(self):
+        """Load the ETag and Last-Modified values stored for each source"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT url, etag, last_modified FROM data_source_tracking")
+        return {url: (etag, last_modified) for url, etag, last_modified in cursor.fetchall()}
+    
+    async def _fetch_sources(self, sources, validators):
+        """Fetch all sources concurrently, returning their responses in order"""
+        semaphore = asyncio.Semaphore(self.config["max_concurrent_fetches"])
+        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+            return await asyncio.gather(
+                *(self.fetch_source_data(client, semaphore, source, validators.get(source['url']))
+                  for source in sources),
+                return_exceptions=True
             )
-            self.conn.commit()
-            return None
+    
+    def _update_source_tracking(self, sources, responses):
+        """Record the outcome of each source fetch"""
+        cursor = self.conn.cursor()
+        for source, response in zip(sources, responses):
+            if response is None:
+                # Update source status
+                cursor.execute(
+                    "UPDATE data_source_tracking SET status = ? WHERE url = ?",
+                    ("error", source['url'])
+                )
+            elif response.status_code == 304:
+                # Unchanged since the last fetch; the stored validators still apply
+                cursor.execute(
+                    "UPDATE data_source_tracking SET last_checked = ?, status = ? WHERE url = ?",
+                    (datetime.datetime.now(), "active", source['url'])
+                )
+            else:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO data_source_tracking
+                    (url, last_checked, last_updated, status, etag, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    source['url'], datetime.datetime.now(), None, "active",
+                    response.headers.get("ETag"), response.headers.get("Last-Modified")
+                ))
+        self.conn.commit()
             
     def parse_irs_updates(self, html_content, source_type):
         """Parse IRS website HTML to extract updates"""
         if not html_content:
             return []
             
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, 'lxml')
         updates = []
         
         if source_type == "news":
@@ -145,7 +223,7 @@ class TaxDataMonitor:
                 if title_elem and date_elem:
                     updates.append({
                         "title": title_elem.text.strip(),
-                        "date": parse_date(date_elem.text.strip()),
+                        "date": _parse_date(date_elem.text.strip()),
                         "url": item.find("a")["href"] if item.find("a") else "",
                         "source_type": source_type
                     })
@@ -163,7 +241,7 @@ class TaxDataMonitor:
                 
                 if title_elem:
                     try:
-                        date_obj = parse_date(date_text) if date_text else datetime.datetime.now()
+                        date_obj = _parse_date(date_text) if date_text else datetime.datetime.now()
                         updates.append({
                             "title": title_elem.text.strip(),
                             "date": date_obj,
@@ -181,7 +259,7 @@ class TaxDataMonitor:
         if not html_content:
             return []
             
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, 'lxml')
         updates = []
         
         if source_type == "opinions":
@@ -194,7 +272,7 @@ class TaxDataMonitor:
                 
                 if title_elem and date_elem:
                     try:
-                        date_obj = parse_date(date_elem.text.strip())
+                        date_obj = _parse_date(date_elem.text.strip())
                         updates.append({
                             "title": title_elem.text.strip(),
                             "date": date_obj,
@@ -209,17 +287,37 @@ class TaxDataMonitor:
     def check_for_updates(self):
         """Check all configured sources for updates"""
         all_updates = []
+        irs_sources = self.config["irs_sources"]
+        court_sources = self.config["court_sources"]
+        sources = irs_sources + court_sources
+        
+        # Fetch every source at once; the total wait is the slowest fetch, not the sum
+        validators = self._load_validators()
+        responses = asyncio.run(self._fetch_sources(sources, validators))
+        for i, response in enumerate(responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error fetching {sources[i]['url']}: {response}")
+                responses[i] = None
+        
+        # Source tracking is updated here, outside the event loop
+        self._update_source_tracking(sources, responses)
+        
+        # Pages that have not changed since the last check are not parsed again
+        contents = []
+        for source, response in zip(sources, responses):
+            if response is not None and response.status_code == 304:
+                logger.info(f"No changes since last check: {source['url']}")
+                response = None
+            contents.append(response.text if response is not None else None)
         
         # Check IRS sources
-        for source in self.config["irs_sources"]:
-            html_content = self.fetch_source_data(source)
+        for source, html_content in zip(irs_sources, contents):
             if html_content:
                 updates = self.parse_irs_updates(html_content, source["type"])
                 all_updates.extend(updates)
                 
         # Check court sources
-        for source in self.config["court_sources"]:
-            html_content = self.fetch_source_data(source)
+        for source, html_content in zip(court_sources, contents[len(irs_sources):]):
             if html_content:
                 updates = self.parse_court_updates(html_content, source["type"])
                 all_updates.extend(updates)
@@ -241,14 +339,15 @@ class TaxDataMonitor:
         old_laws = cursor.fetchall()
         logger.info(f"Found {len(old_laws)} potentially outdated laws")
         
-        # Flag them for review
-        for law in old_laws:
-            cursor.execute('''
+        # Flag them for review with one prepared statement in one transaction
+        flag_date = datetime.datetime.now().isoformat()
+        rows = [(law[0], law[1], law[2], flag_date, "needs_review") for law in old_laws]
+        with self.conn:
+            self.conn.executemany('''
                 INSERT INTO outdated_laws (law_id, title, publication_date, flag_date, status)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (law[0], law[1], law[2], datetime.datetime.now().isoformat(), "needs_review"))
+            ''', rows)
         
-        self.conn.commit()
         return old_laws
     
     def generate_freshness_report(self):
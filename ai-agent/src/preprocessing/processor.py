@@ -9,10 +9,12 @@ import os
 import json
 import logging
 import PyPDF2
-import glob
 from datetime import datetime
 import re
 
+# Extensions of downloaded files that are picked up for processing
+PROCESSABLE_EXTENSIONS = ('.pdf', '.txt', '.html', '.docx')
+
 class DocumentProcessor:
     """Process downloaded tax documents for RAG indexing"""
     
@@ -35,10 +37,13 @@ class DocumentProcessor:
         """Process all new files in the download directory"""
         self.logger.info("Starting to process new downloaded files")
         
-        # Get list of all files in download directory
-        files = []
-        for extension in ['pdf', 'txt', 'html', 'docx']:
-            files.extend(glob.glob(os.path.join(self.download_dir, f'*.{extension}')))
+        # Get list of all files in download directory, and the names already
+        # processed, with one directory scan each
+        files = [
+            entry.path for entry in self._scan_files(self.download_dir)
+            if entry.name.endswith(PROCESSABLE_EXTENSIONS)
+        ]
+        processed_names = {entry.name for entry in self._scan_files(self.processed_dir)}
         
         if not files:
             self.logger.info("No files found for processing")
@@ -55,7 +60,7 @@ class DocumentProcessor:
                 
                 # Skip already processed files
                 processed_path = self._get_processed_path(file_path)
-                if os.path.exists(processed_path):
+                if os.path.basename(processed_path) in processed_names:
                     self.logger.info(f"Skipping already processed file: {os.path.basename(file_path)}")
                     processed_files.append(processed_path)
                     continue
@@ -70,6 +75,23 @@ class DocumentProcessor:
         self.logger.info(f"Processed {len(processed_files)} files")
         return processed_files
     
+    def process_downloaded_file(self, file_path):
+        """Process a single downloaded file unless it was processed already, returning the processed path"""
+        processed_path = self._get_processed_path(file_path)
+        if os.path.exists(processed_path):
+            self.logger.info(f"Skipping already processed file: {os.path.basename(file_path)}")
+            return processed_path
+        
+        return self.process_file(file_path)
+    
+    def _scan_files(self, directory):
+        """List the visible regular files in a directory as DirEntry objects"""
+        try:
+            with os.scandir(directory) as it:
+                return [entry for entry in it if entry.is_file() and not entry.name.startswith('.')]
+        except FileNotFoundError:
+            return []
+    
     def process_file(self, file_path):
         """Process a single file based on its type"""
         file_ext = os.path.splitext(file_path)[1].lower()
@@ -0,0 +1 @@
+# Utils Module - Small helpers shared across the agent
@@ -0,0 +1,72 @@
+"""
+Bloom Filter
+
+This module provides a small fixed-size Bloom filter for remembering large
+sets of seen strings (such as document URLs) in constant memory.
+"""
+
+import hashlib
+import math
+import os
+import struct
+
+# Serialized header: number of bits, number of hash functions
+_HEADER = struct.Struct('<QI')
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; may report false positives, never false negatives"""
+    
+    def __init__(self, capacity=100000, error_rate=1e-4):
+        """Size the filter for the expected number of items and false positive rate"""
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, item):
+        """Yield the bit positions for an item using double hashing of one digest"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+    
+    def add(self, item):
+        """Add an item, returning True if it was not already present"""
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        return added
+    
+    def __contains__(self, item):
+        """Check whether an item has (probably) been added"""
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+    
+    def save(self, path):
+        """Write the filter to disk atomically"""
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(self.num_bits, self.num_hashes))
+            f.write(self.bits)
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        """Read a filter written by save(), or return None if the file doesn't exist"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        
+        if len(data) < _HEADER.size:
+            raise ValueError(f"Corrupt Bloom filter file: {path}")
+        
+        bloom = cls.__new__(cls)
+        bloom.num_bits, bloom.num_hashes = _HEADER.unpack_from(data)
+        bloom.bits = bytearray(data[_HEADER.size:])
+        if len(bloom.bits) != (bloom.num_bits + 7) // 8:
+            raise ValueError(f"Corrupt Bloom filter file: {path}")
+        return bloom
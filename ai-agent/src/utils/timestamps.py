@@ -0,0 +1,28 @@
+"""
+Timestamp Utilities
+
+This module provides a cached ISO-8601 timestamp for hot code paths that stamp
+metadata and status records many times per second.
+"""
+
+import time
+from datetime import datetime
+
+# How long a formatted timestamp is reused, in seconds
+TIMESTAMP_RESOLUTION = 0.01
+
+# Last formatted timestamp as (epoch seconds, ISO string); replaced as a
+# whole tuple so readers on other threads never see a torn pair
+_cached_timestamp = (0.0, '')
+
+def now_iso():
+    """Return the current local time as an ISO-8601 string, refreshed at most every 10 ms"""
+    global _cached_timestamp
+    now = time.time()
+    cached_at, cached_iso = _cached_timestamp
+    if 0 <= now - cached_at < TIMESTAMP_RESOLUTION:
+        return cached_iso
+    
+    iso = datetime.fromtimestamp(now).isoformat()
+    _cached_timestamp = (now, iso)
+    return iso
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for random tax law sampling in the accuracy auditor.
+"""
+
+import itertools
+import os
+import sqlite3
+import sys
+
+# Add the monitoring directory to path to import the auditor script
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'monitoring'))
+import audit_accuracy
+from audit_accuracy import AIAccuracyAuditor
+
+# Ids left in the sample table: a third of 1-30 deleted, plus one far-off row
+LAW_IDS = [i for i in range(1, 31) if i % 3 != 0] + [1000000]
+
+def _make_auditor(id_column):
+    """Build an auditor over an in-memory tax_laws table with large rowid gaps"""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE tax_laws ({id_column}, title TEXT)")
+    conn.executemany("INSERT INTO tax_laws (id, title) VALUES (?, ?)", [(i, f"Law {i}") for i in LAW_IDS])
+    
+    auditor = AIAccuracyAuditor.__new__(AIAccuracyAuditor)
+    auditor.conn = conn
+    return auditor
+
+def _pick_rowids_in_order(monkeypatch):
+    """Make rowid picks deterministic: 1, 2, 3, ... in turn"""
+    rowids = itertools.count(1)
+    monkeypatch.setattr(audit_accuracy.random, 'randint', lambda low, high: next(rowids))
+
+def test_sample_tax_laws_integer_primary_key(monkeypatch):
+    """Topping up a sparse sample when id is an INTEGER PRIMARY KEY"""
+    _pick_rowids_in_order(monkeypatch)
+    auditor = _make_auditor("id INTEGER PRIMARY KEY")
+    
+    # The picks reach rowid 48 and find 20 rows, so the far-off row
+    # can only come from the top-up query
+    laws = auditor._sample_tax_laws(25)
+    
+    assert sorted(law["id"] for law in laws) == LAW_IDS
+
+def test_sample_tax_laws_plain_id(monkeypatch):
+    """Sampling a table whose id is an ordinary column"""
+    _pick_rowids_in_order(monkeypatch)
+    auditor = _make_auditor("id INTEGER")
+    laws = auditor._sample_tax_laws(5)
+    
+    assert len(laws) == 5
+    assert len({law["id"] for law in laws}) == 5
+    assert all(law["id"] in LAW_IDS for law in laws)